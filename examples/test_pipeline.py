@@ -9,7 +9,7 @@ import numpy as np
 
 from passive_radar.capture.kraken_reader import load_iq, calibrate_iq
 from passive_radar.preprocess.filters import mti_filter, fir_highpass, normalize
-from passive_radar.caf.caf import compute_caf_block
+from passive_radar.caf.caf import compute_caf_map
 from passive_radar.detect.cfar import cfar_2d, extract_peaks
 from passive_radar.postprocess.morphology import morph_clean
 from passive_radar.postprocess.clustering import dbscan_cluster
@@ -28,7 +28,7 @@ def run_pipeline(iq_file: str, sample_rate: float = 1e6):
     iq_data = mti_filter(iq_data)
 
     # === CAF ===
-    caf_matrix = compute_caf_block(iq_data, ref_channel=0, sr=sample_rate)
+    caf_matrix = compute_caf_map(iq_data)
 
     # === CFAR ===
     cfar_mask = cfar_2d(caf_matrix)
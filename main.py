@@ -17,7 +17,7 @@ def main():
     iq = kraken_reader.load_iq("data/sample.iq")
 
     # 2. Вычисляем CAF
-    caf_matrix = caf.compute_caf_block(iq)
+    caf_matrix = caf.compute_caf_map(iq)
 
     # 3. MTI фильтрация
     caf_mti = filters.mti_filter(caf_matrix)
@@ -1,11 +1,10 @@
 """
+CAF (Cross Ambiguity Function) module
+=====================================
+
 CAF (Cross Ambiguity Function) optimized for Raspberry Pi 5.
 Supports 5-channel passive radar (KrakenSDR).
 Performs FFT-based range-Doppler processing efficiently.
-"""
-"""
-CAF (Cross Ambiguity Function) module
-=====================================
 
 Оптимизирован для многопроцессной обработки 5 каналов на Raspberry Pi 5.
 Работает как с офлайн-данными, так и в режиме реального времени.
@@ -13,7 +12,13 @@ CAF (Cross Ambiguity Function) module
 Функция process_iq_block() вызывается из kraken_reader.py для каждого канала.
 """
 
+import os
+import atexit
+import functools
+import pickle
 import numpy as np
+from scipy import fft as sp_fft
+from scipy.signal import firwin, upfirdn
 import time
 import logging
 
@@ -23,6 +28,25 @@ try:
 except ImportError:
     USE_FFTW = False
 
+try:
+    import cupy as cp
+    USE_CUPY = True
+except ImportError:
+    USE_CUPY = False
+
+try:
+    import numexpr as ne
+    USE_NUMEXPR = True
+except ImportError:
+    USE_NUMEXPR = False
+
+try:
+    import numba
+    import rocket_fft  # noqa: F401 — регистрирует np.fft внутри numba nopython
+    USE_NUMBA_FFT = True
+except ImportError:
+    USE_NUMBA_FFT = False
+
 # Настройка логирования (по желанию можно отключить)
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] [CAF-%(levelname)s] %(message)s')
 
@@ -31,62 +55,781 @@ logging.basicConfig(level=logging.INFO, format='[%(asctime)s] [CAF-%(levelname)s
 # Константы
 # ────────────────────────────────
 FFT_SIZE = 32768
+BATCH = 16                 # блоков на один пакетный вызов в compute_caf_stream
 DOWNSAMPLE = 4             # для уменьшения нагрузки
 ZERO_PAD = 2               # коэффициент нулевого дополнения
-WINDOW = np.hanning(FFT_SIZE // DOWNSAMPLE)
+DECIM_TAPS = 8 * DOWNSAMPLE + 1  # длина антиалиасингового FIR дециматора
+FFTW_FLAGS = ('FFTW_MEASURE',)
+FFTW_THREADS = os.cpu_count() or 1
+FFT_WORKERS = FFTW_THREADS  # потоки pocketfft (scipy.fft), если нет pyFFTW
+WISDOM_FILE = os.path.expanduser("~/.cache/passive_radar/fftw_wisdom.pkl")
+
+
+# ────────────────────────────────
+# Планы FFTW (создаются один раз на размер)
+# ────────────────────────────────
+def _load_wisdom(path=WISDOM_FILE):
+    """
+    Загружает накопленную FFTW wisdom, чтобы FFTW_MEASURE не перепланировал
+    при старте.
+    """
+    try:
+        with open(path, "rb") as f:
+            pyfftw.import_wisdom(pickle.load(f))
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+        pass
+
+
+def _save_wisdom(path=WISDOM_FILE):
+    """Сохраняет FFTW wisdom на диск между запусками."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump(pyfftw.export_wisdom(), f)
+    except OSError as e:
+        logging.warning("Не удалось сохранить FFTW wisdom: %s", e)
+
+
+if USE_FFTW:
+    _load_wisdom()
+    atexit.register(_save_wisdom)
+
+
+def _make_plan(shape, flags=FFTW_FLAGS, threads=FFTW_THREADS):
+    """
+    Выровненные буферы и пара планов FFTW (прямой/обратный) по последней оси.
+
+    shape может быть int (1D) или кортежем (batch, n) — тогда FFTW строит
+    один пакетный план на все строки. flags — режим планировщика
+    (FFTW_ESTIMATE — быстрый старт, FFTW_MEASURE/PATIENT — быстрее FFT).
+
+    Returns
+    -------
+    tuple
+        (in_buf, out_buf, fwd, inv): fwd: in_buf → out_buf,
+        inv: out_buf → in_buf
+    """
+    in_buf = pyfftw.empty_aligned(shape, dtype=np.complex64)
+    out_buf = pyfftw.empty_aligned(shape, dtype=np.complex64)
+    fwd = pyfftw.FFTW(in_buf, out_buf, axes=(-1,), direction='FFTW_FORWARD',
+                      flags=flags, threads=threads)
+    inv = pyfftw.FFTW(out_buf, in_buf, axes=(-1,), direction='FFTW_BACKWARD',
+                      flags=flags, threads=threads)
+    return in_buf, out_buf, fwd, inv
+
+
+if USE_NUMBA_FFT:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _caf_kernel(ref_mat, surv_mat, delay_bins, doppler_bins):
+        """
+        CAF целиком в одной nopython-области: сжатие по дальности по сегментам,
+        FFT по Доплеру для каждого бина задержки, fftshift и |·| без
+        промежуточных массивов размера карты.
+        """
+        num_segments = min(surv_mat.shape[0], doppler_bins)
+        n = surv_mat.shape[1]
+        corr = np.zeros((doppler_bins, delay_bins), dtype=np.complex64)
+        for i in numba.prange(num_segments):
+            x = np.fft.ifft(np.fft.fft(surv_mat[i])
+                            * np.conj(np.fft.fft(ref_mat[i], n)))
+            corr[i, :] = x[:delay_bins]
+
+        caf_map = np.empty((doppler_bins, delay_bins), dtype=np.float32)
+        half = doppler_bins // 2
+        for j in numba.prange(delay_bins):
+            dop = np.fft.fft(np.ascontiguousarray(corr[:, j]))
+            for k in range(doppler_bins):
+                v = dop[(k - half) % doppler_bins]
+                caf_map[k, j] = np.sqrt(v.real * v.real + v.imag * v.imag)
+        return caf_map
+
+
+if USE_CUPY:
+    # |x| complex64 → float32 одним ядром на GPU
+    _gpu_abs_kernel = cp.ElementwiseKernel(
+        "complex64 x", "float32 z",
+        "z = sqrt(x.real() * x.real() + x.imag() * x.imag())",
+        "caf_abs_kernel",
+    )
+
+
+def _as_complex64(x):
+    """
+    C-непрерывный complex64 из комплексного массива или из целых пар (I, Q)
+    формата DAQ (shape (..., 2), например int8). Целые отсчёты приводятся
+    к полной шкале [-1, 1) (беззнаковые — со сдвигом к середине шкалы).
+    """
+    x = np.asarray(x)
+    if x.dtype.kind in "iu":
+        half = np.float32(2 ** (8 * x.dtype.itemsize - 1))
+        offset = np.float32(0)
+        if x.dtype.kind == "u":
+            offset = half - np.float32(0.5)
+        out = np.empty(x.shape[:-1], dtype=np.complex64)
+        out.real = x[..., 0]
+        out.imag = x[..., 1]
+        if offset:
+            out -= offset * (1 + 1j)
+        out *= 1 / half
+        return out
+    return np.ascontiguousarray(x, dtype=np.complex64)
+
+
+def _check_c64(arr):
+    """
+    Проверка входа FFT/JIT (только без python -O): C-непрерывный complex64.
+    """
+    assert arr.flags['C_CONTIGUOUS'] and arr.dtype == np.complex64, \
+        f"ожидался C-непрерывный complex64, получен {arr.dtype} {arr.strides}"
+    return arr
+
+
+def _mul_conj(a, b, out=None):
+    """
+    a · conj(b) за один проход (numexpr); без него — conj на месте в out и
+    умножение на месте. out может совпадать с b, но не с a.
+    """
+    if USE_NUMEXPR:
+        return ne.evaluate("a * conj(b)", local_dict={"a": a, "b": b},
+                           out=out, casting="same_kind")
+    out = np.conjugate(b, out=out)
+    out *= a
+    return out
+
+
+def _abs_into(x, out):
+    """
+    |x| комплексного массива во float32 out. С numexpr — один проход по
+    view .real/.imag (SoA-доступ к чередующемуся буферу), иначе np.abs с out.
+    """
+    if USE_NUMEXPR:
+        ne.evaluate("sqrt(re * re + im * im)",
+                    local_dict={"re": x.real, "im": x.imag},
+                    out=out, casting="same_kind")
+    else:
+        np.abs(x, out=out)
+    return out
+
+
+@functools.lru_cache(maxsize=4)
+def _decim_taps(factor, numtaps=DECIM_TAPS):
+    """ФНЧ с частотой среза fs/(2·factor) для децимации в factor раз."""
+    return firwin(numtaps, 1.0 / factor).astype(np.float32)
+
+
+def _decimate(iq, factor=DOWNSAMPLE):
+    """
+    Децимация с антиалиасинговым FIR одним полифазным проходом (upfirdn):
+    считаются только оставляемые отсчёты. Длина — как у iq[::factor],
+    задержка фильтра скомпенсирована.
+    """
+    taps = _decim_taps(factor)
+    n = -(-iq.size // factor)
+    y = upfirdn(taps, iq, up=1, down=factor)
+    delay = (taps.size - 1) // 2 // factor
+    return y[delay:delay + n].astype(np.complex64, copy=False)
+
+
+@functools.lru_cache(maxsize=8)
+def _get_window(n):
+    """Окно Ханна длины n (float32), считается один раз на длину."""
+    return np.hanning(n).astype(np.float32)
+
+
+@functools.lru_cache(maxsize=8)
+def _block_plan(n, zero_pad, threads=FFTW_THREADS):
+    """
+    План FFTW для process_iq_block: окно из n отсчётов, дополненное до
+    n*zero_pad.
+    """
+    return _make_plan(n * zero_pad, threads=threads)
+
+
+# ────────────────────────────────
+# CAF-процессор (reference / surveillance)
+# ────────────────────────────────
+class CAFProcessor:
+    """
+    Вычисление Range-Doppler карты (CAF) для пары каналов
+    reference / surveillance.
+
+    Сигналы режутся на сегменты по ``block_size`` отсчётов; для каждого
+    сегмента считается корреляция surv ⊗ ref через FFT (ось задержки),
+    затем FFT по сегментам даёт ось Доплера. Сегменты surv перекрываются
+    на ``delay_bins`` отсчётов (overlap-save), поэтому корреляция линейная,
+    без циклического заворота на больших задержках.
+
+    Parameters
+    ----------
+    sample_rate : float
+        Частота дискретизации (Гц)
+    block_size : int
+        Длина сегмента / размер FFT по задержке
+    doppler_bins : int
+        Число Доплер-бинов (FFT по сегментам)
+    delay_bins : int
+        Число бинов задержки в выходной карте
+    use_jit : bool
+        Считать карту numba-ядром (нужны numba + rocket-fft). По умолчанию —
+        только если нет pyFFTW: планы FFTW с потоками быстрее ядра.
+    use_gpu : bool
+        Считать карту на GPU через CuPy/cuFFT (если CuPy установлен)
+    gpu_output : bool
+        С use_gpu — возвращать карту как cupy-массив (остаётся на устройстве,
+        например для detect.cfar.cfar_2d_gpu) без копии обратно в RAM
+    plan_flags : tuple
+        Флаги планировщика FFTW для планов этого процессора
+    fft_workers : int
+        Потоки FFT этого процессора (планы FFTW и scipy.fft). При нескольких
+        процессах CAF (по одному на канал) — cpu_count / число процессов,
+        иначе пулы потоков конкурируют за ядра
+    dtype :
+        Тип выходной карты: float32 или float16 (вдвое меньше памяти для
+        хранения и CFAR; расчёт всё равно идёт во float32). float16 — для
+        сигналов в полной шкале [-1, 1]: максимум float16 — 65504
+    """
+
+    def __init__(self, sample_rate=1_000_000, block_size=2048,
+                 doppler_bins=128, delay_bins=256,
+                 use_jit=USE_NUMBA_FFT and not USE_FFTW, use_gpu=False,
+                 plan_flags=FFTW_FLAGS, gpu_output=False, dtype=np.float32,
+                 fft_workers=FFT_WORKERS):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.doppler_bins = doppler_bins
+        self.delay_bins = min(delay_bins, block_size)
+        self.dtype = np.dtype(dtype)
+        self.use_jit = use_jit and USE_NUMBA_FFT
+        self.use_gpu = use_gpu and USE_CUPY
+        self.gpu_output = gpu_output and self.use_gpu
+        if isinstance(plan_flags, str):
+            plan_flags = (plan_flags,)
+        self.plan_flags = tuple(plan_flags)
+        self.fft_workers = max(1, int(fft_workers))
+
+        # Кэш планов FFTW: shape → (in_buf, out_buf, fwd, inv)
+        self._plans = {}
+
+        # Без pyFFTW — рабочие буферы scipy.fft: (shape, slot) → complex64,
+        # FFT в них на месте (overwrite_x), без новых массивов на каждый блок
+        self._work = {}
+
+        # Рабочий буфер для |dop|² (переиспользуется между вызовами)
+        self._pwr = np.empty((1, doppler_bins, self.delay_bins),
+                             dtype=np.float32)
+
+        # fftshift по Доплеру как перестановка двух половин строк:
+        # строки dop[split:] идут в начало карты, dop[:split] — в конец
+        self._dop_split = doppler_bins - doppler_bins // 2
+
+    def _get_plan(self, shape):
+        plan = self._plans.get(shape)
+        if plan is None:
+            plan = _make_plan(shape, self.plan_flags, self.fft_workers)
+            self._plans[shape] = plan
+        return plan
+
+    def _get_work(self, shape, slot):
+        buf = self._work.get((shape, slot))
+        if buf is None:
+            buf = np.empty(shape, dtype=np.complex64)
+            self._work[(shape, slot)] = buf
+        return buf
+
+    def _fft(self, x, n=None, slot=0):
+        """
+        Прямое FFT по последней оси с нулевым дополнением до n.
+
+        Результат — рабочий буфер, он валиден до следующего вызова _fft той же
+        формы: с pyFFTW — выходной буфер плана, со scipy.fft — буфер slot
+        (разные slot позволяют держать два спектра одной формы одновременно).
+        """
+        # Вход копируется в буфер (выровненный буфер плана / рабочий буфер),
+        # так что strided view допустим
+        if n is None:
+            n = x.shape[-1]
+        m = min(n, x.shape[-1])
+        if not USE_FFTW:
+            buf = self._get_work(x.shape[:-1] + (n,), slot)
+            buf[..., :m] = x[..., :m]
+            buf[..., m:] = 0
+            return sp_fft.fft(buf, axis=-1, workers=self.fft_workers,
+                              overwrite_x=True)
+        in_buf, out_buf, fwd, _ = self._get_plan(x.shape[:-1] + (n,))
+        in_buf[..., :m] = x[..., :m]
+        in_buf[..., m:] = 0
+        fwd()
+        return out_buf
+
+    def _ifft(self, x):
+        """
+        Обратное FFT (нормированное); с pyFFTW возвращает буфер плана,
+        со scipy.fft считает на месте в x (x после вызова не использовать).
+        """
+        _check_c64(x)
+        if not USE_FFTW:
+            return sp_fft.ifft(x, axis=-1, workers=self.fft_workers,
+                               overwrite_x=True)
+        in_buf, out_buf, _, inv = self._get_plan(x.shape)
+        out_buf[:] = x
+        inv()
+        return in_buf
+
+    def _ref_spectrum_conj(self, ref_mat, n):
+        """
+        conj(FFT) сегментов опорного канала, считается заново на каждый вызов.
+
+        Кэша нет: приёмные буферы переиспользуются на месте, и по адресу/форме
+        нельзя надёжно понять, что данные в них те же. Спектр пишется в рабочий
+        буфер slot=1 (с pyFFTW — копия буфера плана) и сопрягается на месте.
+        """
+        ref_conj = self._fft(ref_mat, n, slot=1)
+        if USE_FFTW:
+            # буфер плана перезапишет следующее _fft
+            ref_conj = ref_conj.copy()
+        return np.conjugate(ref_conj, out=ref_conj)
+
+    def compute_caf_block(self, ref, echo):
+        """
+        Взаимная корреляция одного блока (профиль по задержке).
+
+        Returns
+        -------
+        np.ndarray
+            Комплексный профиль длины ``block_size`` (нулевая задержка
+            в центре)
+        """
+        ref = np.asarray(ref)
+        echo = np.asarray(echo)
+        echo_spec = self._fft(echo, self.block_size, slot=1)
+        if USE_FFTW:
+            # буфер плана перезапишет следующее _fft
+            echo_spec = echo_spec.copy()
+        # REF · conj(ECHO) одним проходом в буфер спектра ECHO (без копий)
+        prod = _mul_conj(self._fft(ref, self.block_size), echo_spec,
+                         out=echo_spec)
+        return np.fft.fftshift(self._ifft(prod))
+
+    def compute_caf_batch(self, ref_mat, echo_mat):
+        """
+        compute_caf_block для пакета блоков одним пакетным FFT.
+
+        Parameters
+        ----------
+        ref_mat, echo_mat : np.ndarray
+            Блоки shape (n_blocks, block_size) [complex64]
+
+        Returns
+        -------
+        np.ndarray
+            Комплексные профили shape (n_blocks, block_size)
+        """
+        return np.fft.fftshift(self._corr_batch(ref_mat, echo_mat), axes=-1)
+
+    def _corr_batch(self, ref_mat, echo_mat):
+        """Профили compute_caf_batch без fftshift (рабочий буфер FFT)."""
+        ref_mat = np.asarray(ref_mat)
+        echo_mat = np.asarray(echo_mat)
+        echo_spec = self._fft(echo_mat, self.block_size, slot=1)
+        if USE_FFTW:
+            echo_spec = echo_spec.copy()
+        prod = _mul_conj(self._fft(ref_mat, self.block_size), echo_spec,
+                         out=echo_spec)
+        return self._ifft(prod)
+
+    def compute_caf_blocks(self, ref, echo, out=None):
+        """
+        |compute_caf_block| для всех полных блоков длинной пары сигналов
+        одним пакетным FFT (блоки — view (n_blocks, block_size) без копии).
+
+        Parameters
+        ----------
+        out : np.ndarray, optional
+            Готовая матрица (n_blocks, block_size) float32 — модуль пишется
+            прямо в неё (например, буфер, переиспользуемый между записями)
+
+        Returns
+        -------
+        np.ndarray
+            shape (n_blocks, block_size), float32; нулевая задержка в центре.
+            С use_gpu все блоки считаются одним пакетным cuFFT; с gpu_output
+            (и без out) карта остаётся cupy-массивом на устройстве
+        """
+        bs = self.block_size
+        ref = np.asarray(ref)
+        echo = np.asarray(echo)
+        n_blocks = min(ref.shape[-1], echo.shape[-1]) // bs
+        ref_mat = ref[:n_blocks * bs].reshape(n_blocks, bs)
+        echo_mat = echo[:n_blocks * bs].reshape(n_blocks, bs)
+        if self.use_gpu:
+            caf_gpu = self._compute_caf_blocks_gpu(ref_mat, echo_mat)
+            if out is not None:
+                return caf_gpu.get(out=out)
+            return caf_gpu if self.gpu_output else cp.asnumpy(caf_gpu)
+        caf_matrix = out
+        if caf_matrix is None:
+            caf_matrix = np.empty((n_blocks, bs), dtype=np.float32)
+        # |corr| пишется половинами прямо в сдвинутые столбцы caf_matrix —
+        # fftshift без комплексной копии профилей
+        corr = self._corr_batch(ref_mat, echo_mat)
+        k = bs - bs // 2
+        _abs_into(corr[:, k:], caf_matrix[:, :bs - k])
+        _abs_into(corr[:, :k], caf_matrix[:, bs - k:])
+        return caf_matrix
+
+    def compute_caf(self, ref, surv):
+        """
+        Range-Doppler карта для пары каналов.
+
+        Parameters
+        ----------
+        ref : np.ndarray
+            Опорный канал [complex64 или целые пары (I, Q)];
+            shape (N,) или (C, N) — C пар каналов
+        surv : np.ndarray
+            Канал наблюдения, той же формы, что ref
+
+        Returns
+        -------
+        np.ndarray
+            Амплитуда CAF, shape (doppler_bins, delay_bins), тип self.dtype;
+            для (C, N) — среднее по C картам
+        """
+        ref = _as_complex64(ref)
+        surv = _as_complex64(surv)
+        multi = ref.ndim == 2
+        if not multi:
+            ref, surv = ref[None], surv[None]
+        channels = ref.shape[0]
+
+        nfft = self.block_size
+        num_segments = min(ref.shape[-1], surv.shape[-1]) // nfft
+        if num_segments == 0:
+            raise ValueError(
+                f"Сигнал короче одного сегмента ({nfft} отсчётов)")
+
+        # Сегменты ref как матрица (C, num_segments, nfft) — view без копии
+        ref_mat = ref[:, :num_segments * nfft].reshape(
+            channels, num_segments, nfft)
+
+        # Сегменты surv длиной nfft + delay_bins с шагом nfft (overlap-save)
+        # — тоже view; хвост дополняется нулями, только если сигнал кончается
+        # раньше
+        seg_len = nfft + self.delay_bins
+        ext_len = num_segments * nfft + self.delay_bins
+        surv_ext = surv[:, :ext_len]
+        if surv_ext.shape[-1] < ext_len:
+            pad = np.zeros((channels, ext_len - surv_ext.shape[-1]),
+                           np.complex64)
+            surv_ext = np.concatenate([surv_ext, pad], axis=-1)
+        surv_mat = np.lib.stride_tricks.sliding_window_view(
+            surv_ext, seg_len, axis=-1)[:, ::nfft]
+
+        if self.use_gpu:
+            caf_map = self._compute_caf_gpu(ref_mat, surv_mat)
+            caf_map = caf_map.mean(axis=0) if multi else caf_map[0]
+            caf_map = caf_map.astype(self.dtype, copy=False)
+            return caf_map if self.gpu_output else cp.asnumpy(caf_map)
+        elif self.use_jit:
+            caf_map = np.stack([
+                _caf_kernel(_check_c64(r), _check_c64(np.ascontiguousarray(s)),
+                            self.delay_bins, self.doppler_bins)
+                for r, s in zip(ref_mat, surv_mat)])
+        else:
+            caf_map = self._compute_caf_cpu(ref_mat, surv_mat)
+        caf_map = caf_map.mean(axis=0) if multi else caf_map[0]
+        return caf_map.astype(self.dtype, copy=False)
+
+    def _compute_caf_cpu(self, ref_mat, surv_mat):
+        """
+        Карты (C, doppler_bins, delay_bins) пакетными FFT по всем каналам
+        и сегментам.
+        """
+        # Длина FFT — ближайший «быстрый» размер (2^a·3^b·5^c…) не меньше
+        # сегмента: лишние нули не дают заворота на первых delay_bins
+        # задержках
+        n_fft = sp_fft.next_fast_len(surv_mat.shape[-1])
+
+        # Сжатие по дальности: одно пакетное FFT по всем каналам и сегментам
+        ref_conj = self._ref_spectrum_conj(ref_mat, n_fft)
+        prod = self._fft(surv_mat, n_fft)
+        prod *= ref_conj
+        corr = self._ifft(prod)[..., :self.delay_bins]
+
+        # Доплер: FFT по сегментам (медленное время)
+        dop = sp_fft.fft(corr, self.doppler_bins, axis=-2,
+                         workers=self.fft_workers)
+        if self._pwr.shape != dop.shape:
+            self._pwr = np.empty(dop.shape, dtype=np.float32)
+
+        # |dop| = sqrt(re² + im²) сразу во float32, без комплексных/float64
+        # временных массивов; fftshift делается записью половин dop в
+        # сдвинутые строки caf_map, без копии спектра
+        caf_map = np.empty(dop.shape, dtype=np.float32)
+        k = self._dop_split
+        h = self.doppler_bins - k
+        for src, dst, tmp in ((dop[:, k:], caf_map[:, :h], self._pwr[:, :h]),
+                              (dop[:, :k], caf_map[:, h:], self._pwr[:, h:])):
+            np.multiply(src.real, src.real, out=dst, casting='same_kind')
+            np.multiply(src.imag, src.imag, out=tmp, casting='same_kind')
+            dst += tmp
+        np.sqrt(caf_map, out=caf_map)
+        return caf_map
+
+    def _compute_caf_gpu(self, ref_mat, surv_mat):
+        """
+        compute_caf на GPU: те же шаги, что на CPU, через cuFFT.
+        Результат — на устройстве.
+        """
+        seg_len = surv_mat.shape[-1]
+        ref_gpu = cp.asarray(ref_mat)
+        surv_gpu = cp.asarray(np.ascontiguousarray(surv_mat))
+
+        prod = cp.fft.fft(surv_gpu, axis=-1)
+        prod *= cp.conj(cp.fft.fft(ref_gpu, seg_len, axis=-1))
+        corr = cp.fft.ifft(prod, axis=-1)[..., :self.delay_bins]
+
+        dop = cp.fft.fftshift(cp.fft.fft(corr, self.doppler_bins, axis=-2),
+                              axes=-2)
+        return _gpu_abs_kernel(dop.astype(cp.complex64, copy=False))
+
+    def _compute_caf_blocks_gpu(self, ref_mat, echo_mat):
+        """
+        |compute_caf_batch| на GPU: пакетные FFT cuFFT по всем блокам,
+        результат — на устройстве.
+        """
+        ref_gpu = cp.asarray(
+            np.ascontiguousarray(ref_mat, dtype=np.complex64))
+        echo_gpu = cp.asarray(
+            np.ascontiguousarray(echo_mat, dtype=np.complex64))
+
+        prod = cp.fft.fft(ref_gpu, axis=-1)
+        prod *= cp.conj(cp.fft.fft(echo_gpu, axis=-1))
+        corr = cp.fft.fftshift(cp.fft.ifft(prod, axis=-1), axes=-1)
+        return _gpu_abs_kernel(corr.astype(cp.complex64, copy=False))
+
+    def process_multi(self, refs, survs):
+        """
+        Средняя CAF по нескольким парам каналов.
+
+        Все пары считаются одним пакетным FFT (C, num_segments, n) вместо
+        цикла по каналам.
+
+        Parameters
+        ----------
+        refs, survs : sequence of np.ndarray
+            Опорные каналы и каналы наблюдения (одинаковой длины)
+
+        Returns
+        -------
+        np.ndarray
+            Амплитуда CAF, shape (doppler_bins, delay_bins), float32
+        """
+        refs = np.stack([np.asarray(r, dtype=np.complex64) for r in refs])
+        survs = np.stack([np.asarray(s, dtype=np.complex64) for s in survs])
+        return self.compute_caf(refs, survs)
+
+    def warmup(self, n_samples):
+        """
+        Заранее строит планы FFT (и компилирует JIT) для сигналов длины
+        n_samples, чтобы первый кадр в реальном времени не ждал планировщик.
+        """
+        x = np.zeros(n_samples, dtype=np.complex64)
+        self.compute_caf(x, x)
+
+
+_default_processor = None
+
+
+def _get_default_processor():
+    global _default_processor
+    if _default_processor is None:
+        _default_processor = CAFProcessor()
+    return _default_processor
+
+
+def compute_caf_map(iq, ref=None):
+    """
+    Range-Doppler карта (doppler_bins, delay_bins) блока IQ через
+    CAFProcessor.compute_caf общего процессора модуля.
+
+    Не путать с CAFProcessor.compute_caf_block — тот возвращает один
+    комплексный профиль задержки. Если ``ref`` не задан, считается
+    само-неоднозначность ``iq``.
+    """
+    iq = np.ascontiguousarray(iq, dtype=np.complex64)
+    if ref is None:
+        ref = iq
+    return _get_default_processor().compute_caf(ref, iq)
+
+
+def compute_caf_stream(iq_stream, batch=BATCH, processor=None,
+                       ref_stream=None):
+    """
+    Потоковые профили задержки: блоки копятся в пакет и считаются одним
+    вызовом compute_caf_batch.
+
+    Без ``ref_stream`` это автокорреляция каждого блока с самим собой
+    (само-неоднозначность сигнала, например для проверки тракта), а не CAF
+    между каналами; для CAF нужен поток опорного канала ``ref_stream``.
+
+    Parameters
+    ----------
+    iq_stream : iterable of np.ndarray
+        Блоки IQ канала наблюдения (генератор reader'а или view
+        (n, block_size) из SharedIQBuffer)
+    batch : int
+        Блоков в пакете
+    processor : CAFProcessor, optional
+        Процессор (по умолчанию — общий для модуля)
+    ref_stream : iterable of np.ndarray, optional
+        Блоки опорного канала, синхронные с iq_stream
+
+    Yields
+    ------
+    np.ndarray
+        |профили| блоков пакета, shape (n, block_size), float32;
+        нулевая задержка в центре
+    """
+    proc = processor or _get_default_processor()
+    buf = np.empty((batch, proc.block_size), dtype=np.complex64)
+    ref_buf = buf if ref_stream is None else np.empty_like(buf)
+    if ref_stream is None:
+        pairs = ((b, b) for b in iq_stream)
+    else:
+        pairs = zip(ref_stream, iq_stream)
+    k = 0
+    for ref_block, block in pairs:
+        m = min(block.size, proc.block_size)
+        buf[k, :m] = block[:m]
+        buf[k, m:] = 0
+        if ref_buf is not buf:
+            m = min(ref_block.size, proc.block_size)
+            ref_buf[k, :m] = ref_block[:m]
+            ref_buf[k, m:] = 0
+        k += 1
+        if k == batch:
+            yield np.abs(proc.compute_caf_batch(ref_buf, buf))
+            k = 0
+    if k:
+        yield np.abs(proc.compute_caf_batch(ref_buf[:k], buf[:k]))
+
+
+class SlowTimeRD:
+    """
+    RD-карта из потока профилей задержки: последние ``doppler_bins``
+    профилей лежат в кольцевом буфере, доплер — FFT по медленному времени.
+
+    Циклический сдвиг по времени меняет только фазу спектра, поэтому
+    кольцо не переупорядочивается: |FFT| от буфера с любой позиции записи
+    одинаков. Нулевой доплер — в центре (сдвиг половинами, как в compute_caf).
+
+    fft_workers — потоки FFT по медленному времени (обычно берутся у
+    CAFProcessor, который считает профили).
+    """
+
+    def __init__(self, doppler_bins, delay_bins, fft_workers=FFT_WORKERS):
+        self.doppler_bins = doppler_bins
+        self.delay_bins = delay_bins
+        self.fft_workers = max(1, int(fft_workers))
+        self._ring = np.zeros((doppler_bins, delay_bins), dtype=np.complex64)
+        self._rd = np.zeros((doppler_bins, delay_bins), dtype=np.float32)
+        self._split = doppler_bins - doppler_bins // 2
+        self.n_blocks = 0
+
+    @property
+    def ready(self):
+        return self.n_blocks >= self.doppler_bins
+
+    def push(self, profile):
+        """
+        Добавляет комплексный профиль задержки в раскладке compute_caf_block:
+        нулевая задержка в ``profile.size // 2``, задержка d — в индексе
+        ``size // 2 - d`` (REF · conj(ECHO)). В кольцо идут задержки
+        0…delay_bins-1; недостающие дополняются нулями.
+
+        Returns
+        -------
+        np.ndarray or None
+            |RD| shape (doppler_bins, delay_bins) [float32] — общий буфер,
+            перезаписывается следующим push; None, пока кольцо не заполнено
+        """
+        row = self._ring[self.n_blocks % self.doppler_bins]
+        c = profile.size // 2
+        m = min(c + 1, self.delay_bins)
+        row[:m] = profile[c - m + 1:c + 1][::-1]
+        row[m:] = 0
+        self.n_blocks += 1
+        if not self.ready:
+            return None
+        spec = sp_fft.fft(self._ring, axis=0, workers=self.fft_workers)
+        h = self._split
+        np.abs(spec[h:], out=self._rd[:self.doppler_bins - h])
+        np.abs(spec[:h], out=self._rd[self.doppler_bins - h:])
+        return self._rd
+
 
 # ────────────────────────────────
 # Основная функция CAF
 # ────────────────────────────────
-def process_iq_block(iq_block: np.ndarray, channel_id: int = 0):
+def process_iq_block(iq_block: np.ndarray, channel_id: int = 0,
+                     fft_workers: int = FFT_WORKERS):
     """
     Выполняет кросс-амбигуити анализ одного блока IQ-данных для данного канала.
 
     Parameters
     ----------
     iq_block : np.ndarray
-        IQ-комплексный сигнал [complex64]
+        IQ-комплексный сигнал [complex64] или целые пары (I, Q)
     channel_id : int
         Номер канала KrakenSDR (0–4)
+    fft_workers : int
+        Потоки FFT (план FFTW / scipy.fft); при процессе на канал —
+        cpu_count / число каналов
     """
     t0 = time.time()
+    iq_block = _as_complex64(iq_block)
 
     if iq_block.size < FFT_SIZE:
-        logging.warning(f"CAF-{channel_id}: блок слишком короткий ({iq_block.size})")
+        logging.warning("CAF-%s: блок слишком короткий (%d)",
+                        channel_id, iq_block.size)
         return None
 
-    # Downsample
-    iq_ds = iq_block[::DOWNSAMPLE]
+    # Downsample: полифазный FIR-дециматор без наложения шума
+    iq_ds = _decimate(iq_block)
     n = len(iq_ds)
 
-    # Окно
-    iq_win = iq_ds * WINDOW[:n]
-
-    # FFT
     if USE_FFTW:
-        fft_in = pyfftw.empty_aligned(n, dtype=np.complex64)
-        fft_out = pyfftw.empty_aligned(n * ZERO_PAD, dtype=np.complex64)
-        fft_in[:] = iq_win
-        fft_obj = pyfftw.FFTW(fft_in, fft_out, direction='FFTW_FORWARD', flags=('FFTW_ESTIMATE',))
-        spec = fft_obj()
+        # Окно пишется прямо во входной буфер плана, |X|² и IFFT — туда же
+        fft_in, fft_out, fwd, inv = _block_plan(n, ZERO_PAD, fft_workers)
+        np.multiply(iq_ds, _get_window(n), out=fft_in[:n], casting='same_kind')
+        fft_in[n:] = 0
+        fwd()
+        np.multiply(fft_out, fft_out.conj(), out=fft_out)
+        inv()
+        caf = np.fft.ifftshift(fft_in)
     else:
-        spec = np.fft.fft(iq_win, n * ZERO_PAD)
-
-    # CAF: автокорреляция во временной и частотной области
-    caf = np.fft.ifftshift(np.fft.ifft(spec * np.conj(spec)))
+        # Окно
+        iq_win = iq_ds * _get_window(n)
+        spec = sp_fft.fft(iq_win.astype(np.complex64, copy=False),
+                          n * ZERO_PAD, workers=fft_workers)
 
-    # Амплитуда CAF
-    magnitude = np.abs(caf)
+        # CAF: автокорреляция во временной и частотной области
+        caf = np.fft.ifftshift(sp_fft.ifft(spec * np.conj(spec),
+                                           workers=fft_workers))
 
-    # Нормализация
-    magnitude /= magnitude.max() + 1e-6
+    # Мощность CAF за один проход (argmax |caf|² == argmax |caf|)
+    power = np.multiply(caf.real, caf.real, dtype=np.float32)
+    power += np.multiply(caf.imag, caf.imag, dtype=np.float32)
 
-    # Метрики
-    peak_idx = np.argmax(magnitude)
-    peak_val = magnitude[peak_idx]
+    # Метрики: нормализуем только пик, а не всю карту
+    peak_idx = np.argmax(power)
+    peak_amp = np.sqrt(power[peak_idx])
+    peak_val = peak_amp / (peak_amp + 1e-6)
 
     dt = (time.time() - t0) * 1000
-    logging.info(f"CAF-{channel_id}: OK  | peak={peak_val:.3f} | time={dt:.1f} ms")
+    logging.info("CAF-%s: OK  | peak=%.3f | time=%.1f ms",
+                 channel_id, peak_val, dt)
 
     return {
         "channel_id": channel_id,
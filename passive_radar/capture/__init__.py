@@ -3,3 +3,6 @@
 Чтение и калибровка IQ данных (например, из KrakenSDR).
 """
 from . import kraken_reader
+from .kraken_reader import KrakenReader, chunk_iq
+
+__all__ = ["kraken_reader", "KrakenReader", "chunk_iq"]
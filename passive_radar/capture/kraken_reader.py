@@ -20,6 +20,13 @@ from passive_radar.capture.kraken_reader import get_iq_source
 for block in get_iq_source(mode="udp", host="0.0.0.0", port=5000):
     print(f"Получен блок: {len(block)}")
 
+🔁 3. Без копий (блок валиден до следующей итерации):
+from passive_radar.capture.kraken_reader import KrakenReader
+
+reader = KrakenReader(mode="udp", port=5000, chunk_samples=4096)
+for block in reader.stream():
+    ...
+
     Как это работает
     Модуль               	Задача
 UDP Reader            	Читает поток IQ-данных от KrakenSDR по UDP и пишет в shared memory
@@ -28,11 +35,19 @@ CAF Workers (×5)	      Каждый процесс берёт «свой» ка
 Event Sync	            Синхронизирует запуск — чтобы CAF-процессы не начали раньше, чем reader создаст поток
 
 """
+import os
+import sys
 import socket
+import ctypes
+import threading
+import logging
 import numpy as np
-from multiprocessing import shared_memory, Process, Event
+from multiprocessing import shared_memory, Process, Event, Value, Condition
 from passive_radar.caf.caf import process_iq_block
 
+logger = logging.getLogger(__name__)
+
+
 # ────────────────────────────────
 # Константы
 # ────────────────────────────────
@@ -42,93 +57,858 @@ CHANNELS = 5                     # KrakenSDR: 5 каналов
 DTYPE = np.complex64
 NUM_BLOCKS = 8                   # глубина кольцевого буфера
 UDP_PORT = 5000
+UDP_RCVBUF = 8 << 20             # буфер сокета в ядре, 8 МБ
+ALIGN = 64                       # выравнивание shared memory (кэш / AVX)
+UDP_WORKERS = 1                  # сокетов/потоков приёма на порту (REUSEPORT)
+RECV_BATCH = 16                  # пакетов за один recvmmsg (глубина пула)
+SEQ_HEADER = 8                   # заголовок пакета DAQ: uint64 номер пакета
+REORDER_DEPTH = 8                # окно переупорядочивания пакетов по номеру
+
+
+# ────────────────────────────────
+# Источник IQ (файл / UDP)
+# ────────────────────────────────
+def _aligned_empty(nbytes, align=ALIGN):
+    """Байтовый буфер с началом, выровненным на align байт."""
+    raw = np.empty(nbytes + align, dtype=np.uint8)
+    offset = (-raw.ctypes.data) % align
+    return raw[offset:offset + nbytes]
+
+
+def _open_udp_socket(host, port, reuse_port=False):
+    """
+    UDP-сокет с увеличенным приёмным буфером (меньше потерь пакетов).
+
+    reuse_port=True — несколько сокетов на одном порту; ядро само
+    распределяет пакеты между ними (SO_REUSEPORT, Linux/BSD).
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_RCVBUF)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    return sock
+
+
+# ────────────────────────────────
+# recvmmsg (Linux): несколько пакетов за один системный вызов
+# ────────────────────────────────
+class _IOVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [("msg_name", ctypes.c_void_p),
+                ("msg_namelen", ctypes.c_uint32),
+                ("msg_iov", ctypes.POINTER(_IOVec)),
+                ("msg_iovlen", ctypes.c_size_t),
+                ("msg_control", ctypes.c_void_p),
+                ("msg_controllen", ctypes.c_size_t),
+                ("msg_flags", ctypes.c_int)]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _MsgHdr), ("msg_len", ctypes.c_uint)]
+
+
+MSG_WAITFORONE = 0x10000         # вернуться после первого же пакета
+
+_recvmmsg = None
+if sys.platform.startswith("linux"):
+    try:
+        _recvmmsg = ctypes.CDLL(None, use_errno=True).recvmmsg
+        _recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr),
+                              ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+        _recvmmsg.restype = ctypes.c_int
+    except AttributeError:
+        _recvmmsg = None
+
+
+class _BatchReceiver:
+    """
+    Приём до vlen UDP-пакетов одним recvmmsg в слоты одного выровненного
+    буфера. Слот валиден до следующего вызова recv().
+    """
+
+    def __init__(self, sock, nbytes, vlen=RECV_BATCH):
+        self.sock = sock
+        self.nbytes = nbytes
+        self.vlen = vlen
+        self.buf = _aligned_empty(vlen * nbytes)
+        self.slots = [self.buf[k * nbytes:(k + 1) * nbytes]
+                      for k in range(vlen)]
+
+        self._iov = (_IOVec * vlen)()
+        self._msgs = (_MMsgHdr * vlen)()
+        for k in range(vlen):
+            self._iov[k].iov_base = self.buf.ctypes.data + k * nbytes
+            self._iov[k].iov_len = nbytes
+            self._msgs[k].msg_hdr.msg_iov = ctypes.pointer(self._iov[k])
+            self._msgs[k].msg_hdr.msg_iovlen = 1
+
+    def recv(self):
+        """Блокируется до первого пакета; возвращает индексы полных пакетов."""
+        n = _recvmmsg(self.sock.fileno(), self._msgs, self.vlen,
+                      MSG_WAITFORONE, None)
+        if n < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        return [k for k in range(n) if self._msgs[k].msg_len == self.nbytes]
+
+
+class KrakenReader:
+    """
+    Источник IQ-блоков KrakenSDR: бинарный файл или UDP-поток.
+
+    Один приёмный буфер, выровненный на 64 байта, выделяется в __init__;
+    файл читается через readinto, UDP — через recv_into, блок отдаётся как
+    view на этот буфер. Пара float32 (I, Q) побайтно совпадает с complex64,
+    поэтому разбор I/Q не нужен.
+
+    Parameters
+    ----------
+    mode : str
+        'file' или 'udp'
+    file_path : str
+        Путь к IQ-файлу (mode='file')
+    ip, port :
+        Адрес приёма (mode='udp')
+    chunk_samples : int
+        Сэмплов в блоке (для UDP — ровно один пакет)
+    dtype :
+        Тип сэмпла: complex64 или целый тип АЦП (например int8) — тогда
+        сэмпл это пара (I, Q) и блок имеет форму (chunk_samples, 2); в
+        complex64 он переводится только внутри CAF (в 8 раз меньше трафика
+        для int8)
+    callback : callable, optional
+        Вызывается с каждым блоком внутри stream()
+    num_workers : int
+        Число сокетов на порту (SO_REUSEPORT) для serve(); у каждого свой
+        поток и свой приёмный буфер
+    batch : int
+        Пакетов за один recvmmsg в stream() (Linux); 1 или другая ОС —
+        recv_into
+    """
+
+    def __init__(self, mode="udp", file_path=None, ip="0.0.0.0", port=UDP_PORT,
+                 chunk_samples=4096, dtype=DTYPE, callback=None,
+                 num_workers=UDP_WORKERS, batch=RECV_BATCH):
+        if mode not in ("file", "udp"):
+            raise ValueError(f"Неизвестный режим: {mode}")
+        self.mode = mode
+        self.file_path = file_path
+        self.ip = ip
+        self.port = port
+        self.chunk_samples = chunk_samples
+        self.dtype = np.dtype(dtype)
+        self.callback = callback
+
+        # Целые типы — пары (I, Q) в «проводном» формате DAQ
+        self.sample_shape = (2,) if self.dtype.kind in "iu" else ()
+        pair = 2 if self.sample_shape else 1
+        self._sample_bytes = self.dtype.itemsize * pair
+        self._bytes_per_chunk = chunk_samples * self._sample_bytes
+        self._buf = _aligned_empty(self._bytes_per_chunk)
+        self._view = self._samples(self._buf)
+
+        self.num_workers = num_workers
+        self.batch = batch if _recvmmsg is not None else 1
+        self.sock = None
+        self.socks = []
+        self._file = None
+        self._threads = []
+        self._stop_event = threading.Event()
+
+        # Многоканальная запись (channels, samples) для офлайн-обработки
+        self.data = None
+        # Та же запись без загрузки в RAM: memmap на канал (open_channels)
+        self._channels = None
+
+    def _samples(self, raw):
+        """View байтового буфера как массив сэмплов (N,) или (N, 2)."""
+        return raw.view(self.dtype).reshape((-1,) + self.sample_shape)
+
+    def start(self):
+        self._stop_event.clear()
+        if self.mode == "udp":
+            if self.sock is None:
+                reuse = self.num_workers > 1
+                self.socks = [
+                    _open_udp_socket(self.ip, self.port, reuse_port=reuse)
+                    for _ in range(self.num_workers)]
+                self.sock = self.socks[0]
+        elif self._file is None:
+            self._file = open(self.file_path, "rb")
+
+    def stop(self):
+        self._stop_event.set()
+        for sock in self.socks:
+            # Будит потоки, заблокированные в recv (для UDP ядро вернёт
+            # ENOTCONN, но поток проснётся)
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        for t in self._threads:
+            t.join()
+        self._threads = []
+        for sock in self.socks:
+            sock.close()
+        self.socks = []
+        self.sock = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def read_into(self, out):
+        """
+        Принимает один полный UDP-пакет прямо в out (writable buffer).
+        Возвращает False для неполного пакета.
+        """
+        nbytes = self._bytes_per_chunk
+        return self.sock.recv_into(out, nbytes) == nbytes
+
+    def stream(self, copy=False):
+        """
+        Генератор IQ-блоков.
+
+        Без copy=True блок — view на приёмный буфер и валиден только до
+        следующей итерации.
+        """
+        self.start()
+        if self.mode == "udp" and self.batch > 1:
+            yield from self._stream_batched(copy)
+            return
+        while True:
+            if self.mode == "udp":
+                try:
+                    n = self.sock.recv_into(self._buf, self._bytes_per_chunk)
+                except OSError:
+                    if self._stop_event.is_set():
+                        return  # сокет закрыт через stop()
+                    raise
+                if n < self._bytes_per_chunk:
+                    if n == 0 and self._stop_event.is_set():
+                        return
+                    continue  # неполный пакет
+                iq = self._view
+            else:
+                n = self._file.readinto(self._buf)
+                if n == 0:
+                    return
+                iq = self._view[:n // self._sample_bytes]
+            if copy:
+                iq = iq.copy()
+            if self.callback is not None:
+                self.callback(iq)
+            yield iq
+
+    def _stream_batched(self, copy):
+        """
+        UDP через recvmmsg: блоки — view на слоты пула, валидны до
+        следующего пакета.
+        """
+        rx = _BatchReceiver(self.sock, self._bytes_per_chunk, self.batch)
+        views = [self._samples(slot) for slot in rx.slots]
+        while True:
+            try:
+                ready = rx.recv()
+            except OSError:
+                if self._stop_event.is_set():
+                    return  # сокет закрыт через stop()
+                raise
+            if not ready and self._stop_event.is_set():
+                return
+            for k in ready:
+                iq = views[k].copy() if copy else views[k]
+                if self.callback is not None:
+                    self.callback(iq)
+                yield iq
+
+    def __iter__(self):
+        return self.stream()
+
+    def serve(self, sinks, timeout=0.5):
+        """
+        Параллельный приём: по потоку на каждый сокет SO_REUSEPORT.
+
+        sinks — по одной функции на поток (len(sinks) == num_workers);
+        sinks[i] вызывается с каждым полным пакетом i-го сокета (view на
+        собственный выровненный буфер потока, валиден до возврата из sink).
+        recv_into отпускает GIL, так что потоки принимают одновременно.
+        """
+        if self.mode != "udp":
+            raise ValueError("serve() доступен только в режиме udp")
+        if len(sinks) != self.num_workers:
+            raise ValueError(
+                f"Нужно {self.num_workers} sinks, получено {len(sinks)}")
+        self.start()
+        for sock, sink in zip(self.socks, sinks):
+            sock.settimeout(timeout)  # чтобы поток замечал stop()
+            t = threading.Thread(target=self._recv_loop, args=(sock, sink),
+                                 daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _recv_loop(self, sock, sink):
+        buf = _aligned_empty(self._bytes_per_chunk)
+        view = self._samples(buf)
+        while not self._stop_event.is_set():
+            try:
+                n = sock.recv_into(buf, self._bytes_per_chunk)
+            except socket.timeout:
+                continue
+            except OSError:
+                return  # сокет закрыт
+            if n == self._bytes_per_chunk:
+                sink(view)
+
+    # ── Офлайн: многоканальная запись (channels, samples), всё в complex64 ──
+
+    def load_channels(self, file_paths):
+        """
+        Читает по файлу complex64 на канал, обрезая до самого короткого.
+
+        Длина берётся из размеров файлов, и каждый канал читается (readinto)
+        сразу в свою строку предвыделенной матрицы (channels, samples) —
+        без промежуточных массивов и vstack.
+        """
+        itemsize = np.dtype(np.complex64).itemsize
+        min_len = min(os.path.getsize(f) for f in file_paths) // itemsize
+        self.data = np.empty((len(file_paths), min_len), dtype=np.complex64)
+        for row, f in zip(self.data, file_paths):
+            with open(f, "rb") as fh:
+                fh.readinto(memoryview(row).cast("B"))
+        return self.data
+
+    def _read_iq_file(self, f):
+        """
+        complex64-файл канала как memmap только для чтения: страницы
+        подгружаются по мере доступа.
+        """
+        return np.memmap(f, dtype=np.complex64, mode="r")
+
+    def open_channels(self, file_paths):
+        """
+        Открывает запись по файлу на канал через memmap, без чтения в RAM.
+
+        Каналы обрезаются до самого короткого; читать их — iter_chunks().
+        Для записей больше памяти: резидентно только текущее окно.
+        Возвращает число сэмплов на канал.
+        """
+        channels = [self._read_iq_file(f) for f in file_paths]
+        min_len = min(ch.shape[0] for ch in channels)
+        self._channels = [ch[:min_len] for ch in channels]
+        return min_len
+
+    def iter_chunks(self, chunk_size):
+        """
+        Блоки (channels, chunk_size) записи по порядку; последний может
+        быть короче.
+
+        Из self.data (load_channels) отдаются view без копий; из memmap
+        (open_channels) каналы копируются в один переиспользуемый буфер,
+        который валиден до следующей итерации. Пары строк блока можно
+        подавать прямо в CAFProcessor.compute_caf_blocks.
+        """
+        if self.data is not None:
+            for start in range(0, self.data.shape[1], chunk_size):
+                yield self.data[:, start:start + chunk_size]
+            return
+        if self._channels is None:
+            raise RuntimeError(
+                "Нет данных: сначала load_channels() или open_channels()")
+        n = self._channels[0].shape[0]
+        buf = np.empty((len(self._channels), chunk_size), dtype=np.complex64)
+        for start in range(0, n, chunk_size):
+            k = min(chunk_size, n - start)
+            for row, ch in zip(buf, self._channels):
+                row[:k] = ch[start:start + k]
+            yield buf[:, :k]
+
+    def remove_dc(self):
+        """
+        Вычитает среднее каждого канала на месте (среднее — complex64,
+        без upcast).
+        """
+        mean = self.data.mean(axis=1, keepdims=True, dtype=np.complex64)
+        np.subtract(self.data, mean, out=self.data)
+        return self.data
+
+    def normalize(self):
+        """
+        Нормирует каждый канал на RMS на месте.
+
+        Мощность канала — vdot(x, x) (BLAS, без массивов |x|²), деление
+        заменено умножением на float32-столбец 1/RMS.
+        """
+        n = self.data.shape[1]
+        power = np.array([np.vdot(row, row).real for row in self.data]) / n
+        scale = (1.0 / (np.sqrt(power) + 1e-12)).astype(np.float32)
+        self.data *= scale[:, None]
+        return self.data
+
+    def preprocess(self):
+        """
+        remove_dc + normalize: оба шага на месте в self.data, без временных
+        матриц (вычитание среднего, чтение для vdot, масштабирование).
+        """
+        self.remove_dc()
+        return self.normalize()
+
+    def calibrate_phase(self, ref_channel=0):
+        """
+        Выравнивает фазы каналов по опорному (фаза vdot(ref, ch)).
+
+        Все vdot — одно матрично-векторное произведение data @ conj(ref)
+        (CGEMV в BLAS); сопрягается только опорная строка, не вся матрица.
+        """
+        dots = self.data @ self.data[ref_channel].conj()
+        phase_offsets = np.angle(dots)
+        phase_offsets[ref_channel] = 0
+        # Поправка exp(-j·φ) строго complex64 (complex128-множитель поднял бы
+        # всё произведение до complex128): cos/sin пишутся сразу в её
+        # real/imag, без np.exp
+        phase_offsets = phase_offsets.astype(np.float32, copy=False)
+        corr = np.empty(phase_offsets.shape, dtype=np.complex64)
+        np.cos(phase_offsets, out=corr.real)
+        np.sin(phase_offsets, out=corr.imag)
+        np.negative(corr.imag, out=corr.imag)
+        np.multiply(self.data, corr[:, None], out=self.data)
+        for ch, po in enumerate(phase_offsets):
+            if ch != ref_channel:
+                logger.info("Канал %d: фазовая поправка %.3f рад", ch, po)
+        return self.data
+
+    def save_npy(self, path):
+        """Сохраняет текущие данные каналов в .npy."""
+        np.save(path, self.data)
+
+
+class KrakenUDPReader(KrakenReader):
+    """
+    KrakenReader в режиме UDP (интерфейс realtime-пайплайнов).
+
+    С seq_header=True каждый пакет начинается с uint64 номера (формат DAQ).
+    Пакеты раскладываются в окно из reorder_depth слотов по seq % depth и
+    выдаются строго по порядку: переставленные пакеты встают на место,
+    потерянные заменяются нулевым блоком (поток не сдвигается по времени),
+    опоздавшие отбрасываются. Счётчики — в self.stats (recv / lost / late).
+    """
+
+    def __init__(self, ip="0.0.0.0", port=UDP_PORT, dtype=DTYPE,
+                 chunk_samples=4096, callback=None, seq_header=False,
+                 reorder_depth=REORDER_DEPTH):
+        super().__init__(mode="udp", ip=ip, port=port,
+                         chunk_samples=chunk_samples, dtype=dtype,
+                         callback=callback)
+        self.seq_header = seq_header
+        self.reorder_depth = reorder_depth
+        self.stats = {"recv": 0, "lost": 0, "late": 0}
+        if seq_header:
+            self._pkt = _aligned_empty(SEQ_HEADER + self._bytes_per_chunk)
+            self._slots = np.zeros(
+                (reorder_depth, chunk_samples) + self.sample_shape,
+                dtype=self.dtype)
+            self._filled = np.zeros(reorder_depth, dtype=bool)
+        self._stats_thread = None
+
+    def stream(self, copy=False):
+        if not self.seq_header:
+            yield from super().stream(copy)
+            return
+        for iq in self._stream_seq():
+            if copy:
+                iq = iq.copy()
+            if self.callback is not None:
+                self.callback(iq)
+            yield iq
+
+    def _recv_packets(self):
+        """(seq, payload view) для каждого полного пакета."""
+        self.start()
+        nbytes = SEQ_HEADER + self._bytes_per_chunk
+        seq_view = self._pkt[:SEQ_HEADER].view(np.uint64)
+        payload = self._samples(self._pkt[SEQ_HEADER:])
+        while True:
+            try:
+                n = self.sock.recv_into(self._pkt, nbytes)
+            except OSError:
+                if self._stop_event.is_set():
+                    return
+                raise
+            if n < nbytes:
+                if n == 0 and self._stop_event.is_set():
+                    return
+                continue  # обрезанный пакет — считается потерянным по номеру
+            yield int(seq_view[0]), payload
+
+    def _stream_seq(self):
+        depth = self.reorder_depth
+        slots, filled, stats = self._slots, self._filled, self.stats
+        base = None  # номер следующего выдаваемого пакета
+        for seq, payload in self._recv_packets():
+            stats["recv"] += 1
+            if base is None:
+                base = seq
+            forward = seq >= base + 2 * depth
+            if forward or base - seq > 2 * depth:
+                # Большой разрыв вперёд (долгий простой) или назад (перезапуск
+                # DAQ со сбросом счётчика): окно выдаётся без нулевой заливки,
+                # отсчёт начинается заново с seq. Пропуски за последним
+                # принятым пакетом считаются потерянными только при разрыве
+                # вперёд — после сброса счётчика о них ничего не известно.
+                gap = 0
+                for k in range(base, base + depth):
+                    i = k % depth
+                    if filled[i]:
+                        filled[i] = False
+                        stats["lost"] += gap
+                        gap = 0
+                        yield slots[i]
+                    else:
+                        gap += 1
+                if forward:
+                    stats["lost"] += gap + seq - base - depth
+                base = seq
+            if seq < base:
+                stats["late"] += 1
+                continue
+            while seq >= base + depth:
+                # Окно заполнено: старший слот выдаётся как есть или нулями
+                i = base % depth
+                if not filled[i]:
+                    slots[i] = 0
+                    stats["lost"] += 1
+                filled[i] = False
+                yield slots[i]
+                base += 1
+            slots[seq % depth] = payload
+            filled[seq % depth] = True
+            while filled[base % depth]:
+                filled[base % depth] = False
+                yield slots[base % depth]
+                base += 1
+
+    def log_stats(self, interval=1.0):
+        """
+        Раз в interval секунд пишет счётчики пакетов в лог (фоновый поток).
+        """
+        def loop():
+            while not self._stop_event.wait(interval):
+                stats = self.stats
+                logger.info("SockStat %s: recv=%d lost=%d late=%d",
+                            self.port, stats["recv"], stats["lost"],
+                            stats["late"])
+
+        if self._stats_thread is None:
+            self._stats_thread = threading.Thread(target=loop, daemon=True)
+            self._stats_thread.start()
+
+
+def load_iq(file_path, dtype=DTYPE):
+    """
+    Весь IQ-файл одним массивом (один вызов fromfile, без промежуточных
+    списков).
+    """
+    return np.fromfile(file_path, dtype=dtype)
+
+
+def chunk_iq(iq, chunk_size=4096, hop=None):
+    """
+    Блоки IQ как 2D view (n_chunks, chunk_size) на тот же буфер, без копий.
+
+    hop < chunk_size — блоки с перекрытием (шаг hop); неполный хвост
+    отбрасывается.
+    Итерация по результату даёт блоки-строки.
+    """
+    iq = np.asarray(iq)
+    if hop is None or hop == chunk_size:
+        n = (iq.size // chunk_size) * chunk_size
+        return iq[:n].reshape(-1, chunk_size)
+    return np.lib.stride_tricks.sliding_window_view(iq, chunk_size)[::hop]
+
+
+def get_iq_source(mode="file", file_path=None, chunk_size=4096,
+                  host="0.0.0.0", port=UDP_PORT):
+    """Возвращает генератор IQ-блоков для режима 'file' или 'udp'."""
+    reader = KrakenReader(mode=mode, file_path=file_path, ip=host, port=port,
+                          chunk_samples=chunk_size)
+    return reader.stream(copy=True)
+
+
+# ────────────────────────────────
+# Приём в отдельном потоке (тройной буфер)
+# ────────────────────────────────
+class RingBuffer:
+    """
+    Развязка приёма UDP и обработки: reader работает в своём потоке и
+    копит n_acc блоков в кадр, обработка забирает готовые кадры.
+
+    Три предвыделенных слота с ролями curr / next / copy:
+      • curr — заполняется потоком приёма;
+      • copy — последний полный кадр, ждёт потребителя;
+      • next — отдан потребителю, приём его не трогает.
+    Заполнив curr, поток приёма меняет его с copy; get() меняет copy с next.
+    Если потребитель не успел забрать кадр, он перезаписывается свежим
+    (счётчик dropped) — приём никогда не ждёт обработку.
+    """
+
+    def __init__(self, reader, n_acc=1):
+        self.reader = reader
+        self.n_acc = n_acc
+        self._slots = np.empty(
+            (3, n_acc, reader.chunk_samples) + reader.sample_shape,
+            dtype=reader.dtype)
+        self._curr, self._next, self._copy = 0, 1, 2
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self.dropped = 0
+
+    def start(self):
+        if self._thread is None:
+            self.reader.start()
+            self._thread = threading.Thread(target=self._rx_loop, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self.reader.stop()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _rx_loop(self):
+        k = 0
+        for iq in self.reader.stream():
+            self._slots[self._curr, k] = iq
+            k += 1
+            if k == self.n_acc:
+                with self._lock:
+                    if self._ready.is_set():
+                        self.dropped += 1
+                    self._curr, self._copy = self._copy, self._curr
+                    self._ready.set()
+                k = 0
+
+    def get(self, timeout=None):
+        """
+        Следующий полный кадр (n_acc, chunk_samples) или None по таймауту.
+        Кадр валиден до следующего вызова get().
+        """
+        if not self._ready.wait(timeout):
+            return None
+        with self._lock:
+            self._ready.clear()
+            self._copy, self._next = self._next, self._copy
+            return self._slots[self._next]
+
 
 # ────────────────────────────────
 # Shared Memory Буфер
 # ────────────────────────────────
 class SharedIQBuffer:
-    """Общий буфер IQ-данных для обмена между процессами без копирования."""
+    """
+    Общий буфер IQ-данных для обмена между процессами без копирования.
+
+    Раскладка — по каналам: buffer[channel, block, sample], так что вся
+    история одного канала лежит одним непрерывным участком памяти.
+
+    write_head — общий для процессов счётчик записанных блоков; читатели
+    ждут новых блоков на cond вместо опроса буфера. Несколько колец (по
+    одному на поток приёма) могут делить один cond — тогда читатель ждёт
+    блок сразу во всех (см. wait_for_any).
+    """
 
-    def __init__(self, channels=CHANNELS, num_blocks=NUM_BLOCKS, block_size=BLOCK_SIZE):
+    def __init__(self, channels=CHANNELS, num_blocks=NUM_BLOCKS,
+                 block_size=BLOCK_SIZE, cond=None):
         self.channels = channels
         self.num_blocks = num_blocks
         self.block_shape = (channels, block_size)
-        self.block_size_bytes = np.prod(self.block_shape) * np.dtype(DTYPE).itemsize
+        itemsize = np.dtype(DTYPE).itemsize
+        self.block_size_bytes = channels * block_size * itemsize
         self.total_size = self.num_blocks * self.block_size_bytes
 
-        self.shm = shared_memory.SharedMemory(create=True, size=self.total_size)
-        self.buffer = np.ndarray((self.num_blocks, *self.block_shape), dtype=DTYPE, buffer=self.shm.buf)
+        # Размер кратен 64 байтам; сам сегмент mmap выровнен по странице
+        shm_size = -(-self.total_size // ALIGN) * ALIGN
+        self.shm = shared_memory.SharedMemory(create=True, size=shm_size)
+        self.buffer = np.ndarray((channels, num_blocks, block_size),
+                                 dtype=DTYPE, buffer=self.shm.buf)
 
-        self.write_index = 0
+        if cond is None:
+            self.write_head = Value(ctypes.c_uint64, 0)
+            self.cond = Condition(self.write_head.get_lock())
+        else:
+            # Счётчик защищён общим cond
+            self.write_head = Value(ctypes.c_uint64, 0, lock=False)
+            self.cond = cond
+
+    @property
+    def write_index(self):
+        return self.write_head.value
 
     def write_block(self, iq_block):
-        idx = self.write_index % self.num_blocks
-        self.buffer[idx] = iq_block
-        self.write_index += 1
+        idx = self.write_head.value % self.num_blocks
+        self.buffer[:, idx, :] = iq_block
+        publish_block(self.write_head, self.cond)
         return idx
 
-    def get_block(self, idx):
-        return self.buffer[idx % self.num_blocks]
+    def wait_for_block(self, read_idx, timeout=None):
+        """
+        Ждёт, пока блок read_idx будет записан. Возвращает текущий
+        write_head.
+        """
+        return wait_for_block(self.write_head, self.cond, read_idx, timeout)
+
+    def get_block(self, idx, channel=None):
+        """
+        Блок idx: все каналы (channels, block_size) или один канал
+        (непрерывный).
+        """
+        if channel is None:
+            return self.buffer[:, idx % self.num_blocks]
+        return self.buffer[channel, idx % self.num_blocks]
+
+    def get_blocks(self, start, count, channel=None):
+        """
+        Подряд идущие блоки [start, start+count) как один view (без копии),
+        если они не переходят через конец кольца; иначе — копия.
+        Для одного канала результат (count, block_size) непрерывен.
+        """
+        buf = self.buffer
+        if channel is not None:
+            buf = buf[channel:channel + 1]
+        i = start % self.num_blocks
+        if i + count <= self.num_blocks:
+            blocks = buf[:, i:i + count]
+        else:
+            blocks = np.take(buf, range(start, start + count), axis=1,
+                             mode="wrap")
+        return blocks if channel is None else blocks[0]
 
     def close(self):
         self.shm.close()
         self.shm.unlink()
 
+
+def publish_block(write_head, cond):
+    """Сдвигает write_head на один блок и будит ожидающих читателей."""
+    with cond:
+        write_head.value += 1
+        cond.notify_all()
+
+
+def wait_for_block(write_head, cond, read_idx, timeout=None):
+    """Блокируется, пока write_head не станет больше read_idx."""
+    with cond:
+        cond.wait_for(lambda: write_head.value > read_idx, timeout)
+        return write_head.value
+
+
+def wait_for_any(write_heads, cond, read_idxs, timeout=None):
+    """
+    Ждёт новый блок в любом из колец с общим cond.
+    Возвращает список текущих write_head.
+    """
+    with cond:
+        cond.wait_for(
+            lambda: any(h.value > r for h, r in zip(write_heads, read_idxs)),
+            timeout)
+        return [h.value for h in write_heads]
+
+
 # ────────────────────────────────
 # UDP Reader
 # ────────────────────────────────
-def udp_reader(shared_name, num_blocks, ready_event):
-    """Слушает UDP-поток от KrakenSDR и пишет IQ в shared memory."""
-    shm = shared_memory.SharedMemory(name=shared_name)
-    buffer = np.ndarray((num_blocks, CHANNELS, BLOCK_SIZE), dtype=DTYPE, buffer=shm.buf)
+def udp_reader(shared_names, num_blocks, ready_event, write_heads, cond):
+    """
+    Слушает UDP-поток от KrakenSDR и пишет IQ в shared memory.
 
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind(("0.0.0.0", UDP_PORT))
-    print(f"[UDP] Listening on port {UDP_PORT}")
+    На каждое кольцо из shared_names — свой сокет SO_REUSEPORT и свой поток;
+    ядро раскидывает пакеты по сокетам, каждый поток пишет только в своё
+    кольцо.
+    """
+    shms = [shared_memory.SharedMemory(name=name) for name in shared_names]
+    buffers = [np.ndarray((CHANNELS, num_blocks, BLOCK_SIZE), dtype=DTYPE,
+                          buffer=shm.buf) for shm in shms]
+
+    def make_sink(buffer, write_head):
+        def sink(iq):
+            # Пакет (channels, block_size) раскладывается по каналам; неполные
+            # пакеты отброшены ещё в потоке приёма
+            slot = write_head.value % num_blocks
+            buffer[:, slot, :] = iq.reshape(CHANNELS, BLOCK_SIZE)
+            publish_block(write_head, cond)
+        return sink
+
+    reader = KrakenReader(mode="udp", port=UDP_PORT,
+                          chunk_samples=CHANNELS * BLOCK_SIZE,
+                          num_workers=len(shared_names))
+    reader.serve([make_sink(b, h) for b, h in zip(buffers, write_heads)])
+    print(f"[UDP] Listening on port {UDP_PORT} ({reader.num_workers} sockets)")
 
-    packet_size = BLOCK_SIZE * CHANNELS * 8  # complex64 = 8 bytes
-    write_idx = 0
     ready_event.set()  # сообщаем, что читатель готов
+    for t in reader._threads:
+        t.join()
 
-    while True:
-        data, _ = sock.recvfrom(packet_size)
-        iq = np.frombuffer(data, dtype=np.complex64).reshape(CHANNELS, BLOCK_SIZE)
-        buffer[write_idx % num_blocks] = iq
-        write_idx += 1
 
 # ────────────────────────────────
 # CAF Worker (один процесс на канал)
 # ────────────────────────────────
-def caf_worker(shared_name, num_blocks, channel_id, start_event):
-    """Читает блоки из shared memory для конкретного канала и выполняет CAF."""
-    shm = shared_memory.SharedMemory(name=shared_name)
-    buffer = np.ndarray((num_blocks, CHANNELS, BLOCK_SIZE), dtype=DTYPE, buffer=shm.buf)
+def caf_worker(shared_names, num_blocks, channel_id, start_event,
+               write_heads, cond,
+               fft_workers=max(1, (os.cpu_count() or 1) // CHANNELS)):
+    """
+    Читает блоки из shared memory для конкретного канала и выполняет CAF.
+
+    fft_workers по умолчанию делит ядра между CHANNELS процессами, чтобы
+    их пулы потоков FFT не конкурировали за одни и те же ядра.
+    """
+    shms = [shared_memory.SharedMemory(name=name) for name in shared_names]
+    buffers = [np.ndarray((CHANNELS, num_blocks, BLOCK_SIZE), dtype=DTYPE,
+                          buffer=shm.buf) for shm in shms]
 
     print(f"[CAF-{channel_id}] Started")
     start_event.wait()  # ждём, пока reader начнёт писать
 
-    read_idx = 0
+    read_idxs = [0] * len(buffers)
     while True:
-        block = buffer[read_idx % num_blocks][channel_id]
-        process_iq_block(block, channel_id=channel_id)  # поддержка многоканальности
-        read_idx += 1
+        heads = wait_for_any(write_heads, cond, read_idxs)
+        # Берём блоки из всех колец, где есть новые
+        for r, (buffer, head) in enumerate(zip(buffers, heads)):
+            if head <= read_idxs[r]:
+                continue
+            if head - read_idxs[r] > num_blocks - 1:
+                # reader обогнал на целое кольцо: старые слоты перезаписаны
+                read_idxs[r] = head - 1
+            block = buffer[channel_id, read_idxs[r] % num_blocks]
+            process_iq_block(block, channel_id=channel_id,
+                             fft_workers=fft_workers)
+            read_idxs[r] += 1
+
 
 # ────────────────────────────────
 # Main
 # ────────────────────────────────
 if __name__ == "__main__":
-    shared_buf = SharedIQBuffer()
+    # По кольцу на поток приёма, общий cond для всех колец
+    cond = Condition()
+    rings = [SharedIQBuffer(cond=cond) for _ in range(UDP_WORKERS)]
+    names = [ring.shm.name for ring in rings]
+    heads = [ring.write_head for ring in rings]
 
     ready_event = Event()
 
     # Запускаем UDP reader
-    p_udp = Process(target=udp_reader, args=(shared_buf.shm.name, shared_buf.num_blocks, ready_event))
+    p_udp = Process(target=udp_reader,
+                    args=(names, NUM_BLOCKS, ready_event, heads, cond))
     p_udp.start()
 
     # Запускаем 5 CAF-процессов (по одному на канал)
     workers = []
     for ch in range(CHANNELS):
-        p = Process(target=caf_worker, args=(shared_buf.shm.name, shared_buf.num_blocks, ch, ready_event))
+        p = Process(target=caf_worker,
+                    args=(names, NUM_BLOCKS, ch, ready_event, heads, cond))
         p.start()
         workers.append(p)
 
@@ -18,48 +18,245 @@ python cfar.py --input results/rdmap.npy --out results
 import numpy as np
 import matplotlib.pyplot as plt
 import os
+from scipy.ndimage import uniform_filter
 
+try:
+    import numba
+    USE_NUMBA = True
+except ImportError:
+    USE_NUMBA = False
 
-def cfar_2d(rdmap, guard_cells=(2, 2), ref_cells=(8, 8), pfa=1e-3):
+try:
+    import cupy as cp
+    from cupyx.scipy.ndimage import uniform_filter as _gpu_uniform_filter
+    USE_CUPY = True
+except ImportError:
+    USE_CUPY = False
+
+
+def _integral_image(rdmap):
     """
-    2D CA-CFAR по Range-Doppler карте.
+    Summed-area table с нулевой первой строкой/столбцом:
+    sat[i, j] = rdmap[:i, :j].sum().
+    """
+    sat = np.zeros((rdmap.shape[0] + 1, rdmap.shape[1] + 1), dtype=float)
+    np.cumsum(rdmap, axis=0, dtype=float, out=sat[1:, 1:])
+    np.cumsum(sat[1:, 1:], axis=1, out=sat[1:, 1:])
+    return sat
+
+
+def _box_sum(sat, i0, i1, j0, j1, hd, hr):
+    """
+    Суммы окон (2hd+1)×(2hr+1) с центрами в [i0:i1, j0:j1] — четыре
+    сдвига SAT.
+    """
+    return (sat[i0 + hd + 1:i1 + hd + 1, j0 + hr + 1:j1 + hr + 1]
+            - sat[i0 - hd:i1 - hd, j0 + hr + 1:j1 + hr + 1]
+            - sat[i0 + hd + 1:i1 + hd + 1, j0 - hr:j1 - hr]
+            + sat[i0 - hd:i1 - hd, j0 - hr:j1 - hr])
+
+
+if USE_NUMBA:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _cfar_2d_nb(rdmap, sat, gd, gr, rd, rr, alpha, det_map, thr_map):
+        """
+        CA-CFAR: prange по доплеру, сумма кольца за O(1) по SAT
+        (окно минус защитная зона).
+        """
+        n_doppler, n_range = rdmap.shape
+        wd = rd + gd
+        wr = rr + gr
+        n_train = (2 * wd + 1) * (2 * wr + 1) - (2 * gd + 1) * (2 * gr + 1)
+        for i in numba.prange(wd, n_doppler - wd):
+            for j in range(wr, n_range - wr):
+                outer = (sat[i + wd + 1, j + wr + 1] - sat[i - wd, j + wr + 1]
+                         - sat[i + wd + 1, j - wr] + sat[i - wd, j - wr])
+                inner = (sat[i + gd + 1, j + gr + 1] - sat[i - gd, j + gr + 1]
+                         - sat[i + gd + 1, j - gr] + sat[i - gd, j - gr])
+                threshold = alpha * (outer - inner) / n_train
+                thr_map[i, j] = threshold
+                det_map[i, j] = rdmap[i, j] > threshold
+
+
+def _cfar_2d_sat(rdmap, sat, gd, gr, rd, rr, alpha, det_map, thr_map):
+    """Та же CA-CFAR без numba: все CUT сразу, векторно по сдвигам SAT."""
+    n_doppler, n_range = rdmap.shape
+    wd = rd + gd
+    wr = rr + gr
+    if n_doppler <= 2 * wd or n_range <= 2 * wr:
+        return
+    n_train = (2 * wd + 1) * (2 * wr + 1) - (2 * gd + 1) * (2 * gr + 1)
+    i0, i1, j0, j1 = wd, n_doppler - wd, wr, n_range - wr
+    noise = _box_sum(sat, i0, i1, j0, j1, wd, wr)
+    noise -= _box_sum(sat, i0, i1, j0, j1, gd, gr)
+    thr = thr_map[i0:i1, j0:j1]
+    np.multiply(noise, alpha / n_train, out=thr)
+    np.greater(rdmap[i0:i1, j0:j1], thr, out=det_map[i0:i1, j0:j1],
+               casting='unsafe')
+
+
+def _cfar_2d_filter(rdmap, gd, gr, rd, rr, alpha, det_map, thr_map):
+    """
+    CA-CFAR как линейный фильтр: сумма окна минус сумма защитной зоны
+    через два uniform_filter (разделимые 1-D проходы SciPy на C).
+    """
+    n_doppler, n_range = rdmap.shape
+    wd = rd + gd
+    wr = rr + gr
+    if n_doppler <= 2 * wd or n_range <= 2 * wr:
+        return
+    n_outer = (2 * wd + 1) * (2 * wr + 1)
+    n_guard = (2 * gd + 1) * (2 * gr + 1)
+    noise = uniform_filter(rdmap, size=(2 * wd + 1, 2 * wr + 1),
+                           mode='constant')
+    noise *= n_outer
+    noise -= n_guard * uniform_filter(rdmap, size=(2 * gd + 1, 2 * gr + 1),
+                                      mode='constant')
+    noise *= alpha / (n_outer - n_guard)
+
+    # Краевая полоса без полного опорного окна остаётся нулевой
+    i0, i1, j0, j1 = wd, n_doppler - wd, wr, n_range - wr
+    thr_map[i0:i1, j0:j1] = noise[i0:i1, j0:j1]
+    np.greater(rdmap[i0:i1, j0:j1], noise[i0:i1, j0:j1],
+               out=det_map[i0:i1, j0:j1], casting='unsafe')
+
+
+def cfar_2d_gpu(rdmap, guard_cells=(2, 2), ref_cells=(8, 8), pfa=1e-3):
+    """
+    2D CA-CFAR на GPU (CuPy): формула method='filter' — окно минус защитная
+    зона через cupyx uniform_filter, одна ячейка на поток.
+
+    :param rdmap: карта (numpy или cupy); копируется на устройство, если нужно
+    :return: detection_map, threshold_map — cupy-массивы на устройстве
+    """
+    if not USE_CUPY:
+        raise RuntimeError("cfar_2d_gpu: CuPy не установлен")
+    rdmap = cp.asarray(rdmap, dtype=cp.float32)
+    gd, gr = guard_cells
+    rd, rr = ref_cells
+    wd, wr = rd + gd, rr + gr
+    n_doppler, n_range = rdmap.shape
+    det_map = cp.zeros(rdmap.shape, dtype=cp.uint8)
+    thr_map = cp.zeros(rdmap.shape, dtype=cp.float32)
+    if n_doppler <= 2 * wd or n_range <= 2 * wr:
+        return det_map, thr_map
+
+    n_ref = rd * rr
+    alpha = n_ref * (pfa ** (-1 / n_ref) - 1)
+    n_outer = (2 * wd + 1) * (2 * wr + 1)
+    n_guard = (2 * gd + 1) * (2 * gr + 1)
+    noise = _gpu_uniform_filter(rdmap, size=(2 * wd + 1, 2 * wr + 1),
+                                mode='constant') * n_outer
+    noise -= n_guard * _gpu_uniform_filter(
+        rdmap, size=(2 * gd + 1, 2 * gr + 1), mode='constant')
+
+    valid = (slice(wd, n_doppler - wd), slice(wr, n_range - wr))
+    thr_map[valid] = noise[valid] * (alpha / (n_outer - n_guard))
+    det_map[valid] = rdmap[valid] > thr_map[valid]
+    return det_map, thr_map
+
+
+class CACFAR:
+    """
+    2D CA-CFAR с параметрами, посчитанными один раз при создании.
+
+    alpha, маска опорного окна и число опорных ячеек не зависят от карты,
+    поэтому в realtime-пайплайне детектор создаётся один раз и apply()
+    вызывается для каждого кадра.
 
-    :param rdmap: входная карта (2D numpy array, amplitudes)
     :param guard_cells: (doppler, range) число защитных ячеек вокруг CUT
     :param ref_cells: (doppler, range) число опорных ячеек вокруг зоны CUT
     :param pfa: вероятность ложной тревоги
-    :return: detection_map (бинарная карта), threshold_map (уровень порога)
+    :param method: 'sat' — summed-area table (numba, если есть) или
+        'filter' — scipy.ndimage.uniform_filter
+    :param use_gpu: считать на GPU (cfar_2d_gpu), если есть CuPy; результат
+        остаётся на устройстве, если карта пришла cupy-массивом
+
+    Выходные карты (det uint8, thr float32) выделяются один раз на размер
+    карты и переиспользуются: apply() перезаписывает их на следующем кадре.
     """
-    n_doppler, n_range = rdmap.shape
-    det_map = np.zeros_like(rdmap, dtype=np.uint8)
-    thr_map = np.zeros_like(rdmap, dtype=float)
 
-    # коэффициент (для CA-CFAR с суммированием мощности)
-    alpha = ref_cells[0]*ref_cells[1]*((pfa**(-1/(ref_cells[0]*ref_cells[1])))-1)
+    def __init__(self, guard_cells=(2, 2), ref_cells=(8, 8), pfa=1e-3,
+                 method="sat", use_gpu=False):
+        if method not in ("sat", "filter"):
+            raise ValueError(f"Неизвестный метод CFAR: {method}")
+        self.guard_cells = tuple(guard_cells)
+        self.ref_cells = tuple(ref_cells)
+        self.pfa = pfa
+        self.method = method
+        self.use_gpu = use_gpu and USE_CUPY
 
-    for i in range(ref_cells[0] + guard_cells[0], n_doppler - (ref_cells[0] + guard_cells[0])):
-        for j in range(ref_cells[1] + guard_cells[1], n_range - (ref_cells[1] + guard_cells[1])):
+        # коэффициент (для CA-CFAR с суммированием мощности)
+        n_ref = ref_cells[0] * ref_cells[1]
+        self.alpha = n_ref * (pfa ** (-1 / n_ref) - 1)
 
-            # область для опорных ячеек
-            dop_min = i - (ref_cells[0] + guard_cells[0])
-            dop_max = i + (ref_cells[0] + guard_cells[0])
-            rng_min = j - (ref_cells[1] + guard_cells[1])
-            rng_max = j + (ref_cells[1] + guard_cells[1])
+        # Опорное окно: True — опорные ячейки, False — защитная зона с CUT
+        gd, gr = self.guard_cells
+        rd, rr = self.ref_cells
+        self.mask = np.ones((2 * (gd + rd) + 1, 2 * (gr + rr) + 1), dtype=bool)
+        self.mask[rd:rd + 2 * gd + 1, rr:rr + 2 * gr + 1] = False
+        self.n_train = int(self.mask.sum())
 
-            window = rdmap[dop_min:dop_max+1, rng_min:rng_max+1].copy()
-            # вырезаем область защитных ячеек
-            window[(ref_cells[0]):-(ref_cells[0]+1), (ref_cells[1]):-(ref_cells[1]+1)] = 0
+        self._args = (gd, gr, rd, rr, self.alpha)
+        self._kernel = _cfar_2d_nb if USE_NUMBA else _cfar_2d_sat
+        self.det_map = None
+        self.thr_map = None
 
-            # средний уровень шума
-            noise_level = np.sum(window) / (window.size - (2*guard_cells[0]+1)*(2*guard_cells[1]+1))
-            threshold = alpha * noise_level
-            thr_map[i, j] = threshold
+    def _buffers(self, shape):
+        """
+        Выходные карты под размер кадра; краевая полоса обнуляется только
+        при выделении.
+        """
+        if self.det_map is None or self.det_map.shape != shape:
+            self.det_map = np.zeros(shape, dtype=np.uint8)
+            self.thr_map = np.zeros(shape, dtype=np.float32)
+        return self.det_map, self.thr_map
 
-            # проверка CUT
-            if rdmap[i, j] > threshold:
-                det_map[i, j] = 1
+    def apply(self, rdmap):
+        """
+        :param rdmap: входная карта (2D numpy array, amplitudes)
+        :return: detection_map (бинарная карта), threshold_map (уровень порога)
+        """
+        if self.use_gpu:
+            on_device = isinstance(rdmap, cp.ndarray)
+            det_map, thr_map = cfar_2d_gpu(rdmap, self.guard_cells,
+                                           self.ref_cells, self.pfa)
+            if on_device:
+                return det_map, thr_map
+            return cp.asnumpy(det_map), cp.asnumpy(thr_map)
+        # float32-карта не расширяется до float64 (суммы окна — в SAT)
+        rdmap = np.ascontiguousarray(
+            rdmap, dtype=np.result_type(rdmap, np.float32))
+        # Ядра пишут каждую ячейку внутри краевой полосы — буферы не чистятся
+        det_map, thr_map = self._buffers(rdmap.shape)
+        if self.method == "filter":
+            _cfar_2d_filter(rdmap, *self._args, det_map, thr_map)
+        else:
+            self._kernel(rdmap, _integral_image(rdmap), *self._args,
+                         det_map, thr_map)
+        return det_map, thr_map
 
-    return det_map, thr_map
+    __call__ = apply
+
+
+def cfar_2d(rdmap, guard_cells=(2, 2), ref_cells=(8, 8), pfa=1e-3,
+            method="sat"):
+    """
+    2D CA-CFAR по Range-Doppler карте.
+
+    Сумма опорного кольца для каждой ячейки берётся за O(1) из
+    summed-area table карты (окно минус защитная зона). Для потока кадров
+    удобнее один раз создать CACFAR и вызывать apply().
+
+    :param rdmap: входная карта (2D numpy array, amplitudes)
+    :param guard_cells: (doppler, range) число защитных ячеек вокруг CUT
+    :param ref_cells: (doppler, range) число опорных ячеек вокруг зоны CUT
+    :param pfa: вероятность ложной тревоги
+    :param method: 'sat' — summed-area table (numba, если есть) или
+        'filter' — scipy.ndimage.uniform_filter
+    :return: detection_map (бинарная карта), threshold_map (уровень порога)
+    """
+    return CACFAR(guard_cells, ref_cells, pfa, method).apply(rdmap)
 
 
 def extract_detections(det_map, rdmap, threshold=0):
@@ -68,15 +265,16 @@ def extract_detections(det_map, rdmap, threshold=0):
     :param det_map: бинарная карта CFAR
     :param rdmap: исходная RD карта
     :param threshold: минимальная мощность для записи
-    :return: список детекций [(doppler, range, power), ...]
+    :return: массив детекций shape (K, 3), строки (doppler, range, power)
     """
-    detections = []
-    idx = np.argwhere(det_map == 1)
-    for (i, j) in idx:
-        power = rdmap[i, j]
-        if power > threshold:
-            detections.append((i, j, power))
-    return detections
+    mask = (det_map == 1) & (rdmap > threshold)
+    dop, rng = np.nonzero(mask)
+    # float32 для float32-карты: индексы точны, без промежуточного int64-стека
+    dets = np.empty((dop.size, 3), dtype=np.result_type(rdmap, np.float32))
+    dets[:, 0] = dop
+    dets[:, 1] = rng
+    dets[:, 2] = rdmap[dop, rng]
+    return dets
 
 
 if __name__ == "__main__":
@@ -101,7 +299,7 @@ if __name__ == "__main__":
     # Сохраняем данные
     np.save(os.path.join(args.out, "det_map.npy"), det_map)
     np.save(os.path.join(args.out, "thr_map.npy"), thr_map)
-    np.save(os.path.join(args.out, "detections.npy"), np.array(detections, dtype=object))
+    np.save(os.path.join(args.out, "detections.npy"), detections)
 
     # Визуализация
     plt.figure(figsize=(12, 6))
@@ -1,30 +1,67 @@
 """
 Client that sends local detections to the fusion server and receives fused targets.
+
+One keep-alive HTTP session is reused for all requests. Track payloads are
+sent as msgpack when the package is available (JSON otherwise); fused
+results are polled with If-None-Match, so an unchanged result costs a 304.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import time
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_TYPE = "application/msgpack"
+
 
 class FusionClient:
-    def __init__(self, server_url="http://localhost:8080"):
+    def __init__(self, server_url="http://localhost:8080", use_msgpack=True):
         self.server_url = server_url
+        self.use_msgpack = use_msgpack and msgpack is not None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Last fused result and its ETag (for conditional GET)
+        self._fused = []
+        self._etag = None
 
     def send_tracks(self, tracks):
         payload = {"tracks": tracks}
+        url = f"{self.server_url}/data"
         try:
-            r = requests.post(f"{self.server_url}/data", json=payload, timeout=2)
+            if self.use_msgpack:
+                r = self.session.post(url, data=msgpack.packb(payload),
+                                      headers={"Content-Type": MSGPACK_TYPE},
+                                      timeout=2)
+            else:
+                r = self.session.post(url, json=payload, timeout=2)
             return r.status_code == 200
         except requests.RequestException:
             return False
 
     def get_fused(self):
+        headers = {"If-None-Match": self._etag} if self._etag else None
         try:
-            r = requests.get(f"{self.server_url}/tracks", timeout=2)
-            return r.json()
+            r = self.session.get(f"{self.server_url}/tracks",
+                                 headers=headers, timeout=2)
+            if r.status_code == 304:
+                return self._fused
+            self._fused = r.json()
+            self._etag = r.headers.get("ETag")
+            return self._fused
         except requests.RequestException:
             return []
 
+    def close(self):
+        self.session.close()
+
 
 if __name__ == "__main__":
     client = FusionClient()
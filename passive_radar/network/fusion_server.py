@@ -5,35 +5,103 @@ and broadcasts fused tracks via WebSocket.
 """
 
 import asyncio
+import collections
 import json
-import numpy as np
 from aiohttp import web
 
 from .fusion_utils import fuse_tracks_lsq
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+    _dumps = orjson.dumps
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj).encode()
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+MSGPACK_TYPE = "application/msgpack"
+MAX_REPORTS = 1024  # reports kept for fusion (oldest are dropped)
+
 
 class FusionServer:
-    def __init__(self, host="0.0.0.0", port=8080):
+    def __init__(self, host="0.0.0.0", port=8080, max_reports=MAX_REPORTS,
+                 reuse_port=False):
         self.host = host
         self.port = port
-        self.received_data = []
+        # SO_REUSEPORT would let several server processes share the port, but
+        # received_data, the fused cache and the ETag version are per-process:
+        # POSTs would land on random workers and ETags would collide. Run a
+        # single process until that state is shared (e.g. an external store).
+        self.reuse_port = reuse_port
+        self.received_data = collections.deque(maxlen=max_reports)
+        self._version = 0  # bumped on every POST, used as the ETag of /tracks
+
+        # Fused result is recomputed only after new data (dirty) and served
+        # pre-serialized. The handlers touch this state without awaiting, so
+        # they cannot interleave on the single-threaded event loop and need
+        # no lock
+        self._fused_body = _dumps([])
+        self._dirty = True
 
     async def handle_post(self, request):
-        """Receive detections via POST."""
-        data = await request.json()
+        """Receive detections via POST (JSON or msgpack)."""
+        if request.content_type == MSGPACK_TYPE:
+            if msgpack is None:
+                raise web.HTTPUnsupportedMediaType(
+                    text="msgpack is not installed")
+            data = msgpack.unpackb(await request.read())
+        else:
+            data = await request.json()
         self.received_data.append(data)
+        self._version += 1
+        self._dirty = True
         return web.Response(text="OK")
 
     async def handle_get(self, request):
-        """Return fused targets."""
-        fused = fuse_tracks_lsq(self.received_data)
-        return web.json_response(fused)
+        """
+        Return fused targets (304 if nothing arrived since the client's ETag).
+        """
+        etag = f'"{self._version}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        if self._dirty:
+            fused = fuse_tracks_lsq(list(self.received_data))
+            self._fused_body = _dumps(fused)
+            self._dirty = False
+        body = self._fused_body
+        return web.Response(body=body, content_type="application/json",
+                            headers={"ETag": etag})
 
-    def run(self):
+    def make_app(self):
         app = web.Application()
         app.router.add_post('/data', self.handle_post)
         app.router.add_get('/tracks', self.handle_get)
-        web.run_app(app, host=self.host, port=self.port)
+        return app
+
+    async def _run(self):
+        runner = web.AppRunner(self.make_app())
+        await runner.setup()
+        site = web.TCPSite(runner, self.host, self.port,
+                           reuse_port=self.reuse_port)
+        await site.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    def run(self):
+        if uvloop is not None:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        asyncio.run(self._run())
 
 
 if __name__ == "__main__":
@@ -10,21 +10,15 @@ def fuse_tracks_lsq(reports):
     if not reports:
         return []
 
-    positions = []
-    weights = []
-
-    for r in reports:
-        for t in r.get("tracks", []):
-            positions.append(np.array(t["position"]))
-            weights.append(t.get("snr", 1.0))
-
-    if len(positions) < 2:
+    tracks = [t for r in reports for t in r.get("tracks", [])]
+    if len(tracks) < 2:
         return reports
 
-    positions = np.array(positions)
-    weights = np.array(weights)
-    w = weights / weights.sum()
-    fused_position = np.sum(positions * w[:, None], axis=0)
+    # One contiguous (N, 3) block and one weight vector, not N small arrays
+    positions = np.asarray([t["position"] for t in tracks], dtype=np.float64)
+    weights = np.fromiter((t.get("snr", 1.0) for t in tracks),
+                          dtype=np.float64, count=len(tracks))
+    fused_position = positions.T @ weights / weights.sum()
 
     return [{
         "id": "fused_1",
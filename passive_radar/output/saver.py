@@ -5,12 +5,20 @@ Saver module: responsible for saving radar events, patches, and maintaining a ma
 Functions:
 - save_event: save single detection/track event (metadata) to JSON + append to manifest
 - save_patch: save 2D/3D CAF/MTI patches around detection for later ML training
-- manifest: handles updating/reading manifest.json (index of saved data)
+- manifest: handles appending to/reading manifest.jsonl (index of saved data)
 
 Data is organized under an output_dir with subfolders:
   events/    -> JSON metadata files
   patches/   -> npy/png arrays
-  manifest.json -> global index
+  manifest.jsonl -> global index, append-only JSON Lines
+
+The manifest is never rewritten per event: save_event appends one record,
+save_patch appends a follow-up {"id", "patch"} record, and load_manifest
+folds records by id. compact() rewrites the file with one line per event.
+
+npy patches are rows of a preallocated memory-mapped .npy per session and
+patch shape (patch_index in the manifest, read back with load_patch);
+png patches are rendered in a background thread.
   Как использовать:
   from passive_radar.output import saver
 import numpy as np
@@ -31,21 +39,76 @@ saver.save_patch("results", eid, patch, fmt="npy")
 
 results/
   events/
-    <uuid>.json
+    <id>.json
   patches/
-    <uuid>.npy
-  manifest.json
+    patches_<ns>_64x64.npy
+  manifest.jsonl
 """
 
 import os
+import atexit
 import json
-import uuid
-import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from typing import Dict, Any, Optional
 from pathlib import Path
 from matplotlib import pyplot as plt
 
+try:
+    import orjson
+
+    def _dumps(obj, indent=False) -> bytes:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj, indent=False) -> bytes:
+        return json.dumps(obj, indent=2 if indent else None,
+                          ensure_ascii=False).encode("utf-8")
+
+    _loads = json.loads
+
+MANIFEST_BUFFER = 1 << 16  # bytes buffered before the manifest hits the disk
+MAX_PATCHES = 4096         # rows per memory-mapped patch file
+
+# base_dir -> open append-only manifest file
+_manifest_files: Dict[str, Any] = {}
+
+
+class _PatchStore:
+    """
+    Preallocated .npy (memmap) of shape (capacity, *patch_shape),
+    filled row by row.
+    """
+
+    def __init__(self, path: Path, shape, dtype, capacity: int):
+        self.path = path
+        self.mm = np.lib.format.open_memmap(path, mode="w+", dtype=dtype,
+                                            shape=(capacity,) + shape)
+        self.n = 0
+
+    @property
+    def full(self) -> bool:
+        return self.n >= self.mm.shape[0]
+
+    def append(self, patch: np.ndarray) -> int:
+        row = self.n
+        self.mm[row] = patch
+        self.n += 1
+        return row
+
+
+# (base_dir, shape, dtype) -> current patch store
+_patch_stores: Dict[tuple, _PatchStore] = {}
+
+# png rendering off the pipeline thread
+_png_pool: Optional[ThreadPoolExecutor] = None
+_png_jobs = []
+
 
 def _ensure_dirs(base_dir: str):
     """Create required subfolders if missing."""
@@ -54,24 +117,103 @@ def _ensure_dirs(base_dir: str):
 
 
 def _manifest_path(base_dir: str) -> Path:
-    return Path(base_dir) / "manifest.json"
+    return Path(base_dir) / "manifest.jsonl"
+
+
+def _manifest_file(base_dir: str):
+    """Buffered append handle for base_dir's manifest (opened once)."""
+    f = _manifest_files.get(base_dir)
+    if f is None:
+        f = open(_manifest_path(base_dir), "ab", buffering=MANIFEST_BUFFER)
+        _manifest_files[base_dir] = f
+    return f
+
+
+def _append_manifest(base_dir: str, record: Dict[str, Any]):
+    _manifest_file(base_dir).write(_dumps(record) + b"\n")
+
+
+def flush_manifests():
+    """Flush buffered manifest records of all output dirs to disk."""
+    for f in _manifest_files.values():
+        f.flush()
+
+
+def flush_patches():
+    """Wait for pending png renders and flush memory-mapped patch files."""
+    for job in _png_jobs:
+        job.result()
+    _png_jobs.clear()
+    for store in _patch_stores.values():
+        store.mm.flush()
+
+
+@atexit.register
+def _close_manifests():
+    flush_patches()
+    for f in _manifest_files.values():
+        f.close()
+    _manifest_files.clear()
+
+
+def _patch_store(base_dir: str, patch: np.ndarray) -> _PatchStore:
+    """Current patch file for this dir/shape/dtype; a new one when full."""
+    key = (base_dir, patch.shape, patch.dtype.str)
+    store = _patch_stores.get(key)
+    if store is None or store.full:
+        if store is not None:
+            store.mm.flush()
+        shape_tag = "x".join(map(str, patch.shape))
+        path = Path(base_dir, "patches",
+                    f"patches_{time.time_ns()}_{shape_tag}.npy")
+        store = _PatchStore(path, patch.shape, patch.dtype, MAX_PATCHES)
+        _patch_stores[key] = store
+    return store
+
+
+def _render_png(out_path: Path, img: np.ndarray, cmap: str):
+    global _png_pool
+    if _png_pool is None:
+        _png_pool = ThreadPoolExecutor(max_workers=1,
+                                       thread_name_prefix="saver-png")
+    _png_jobs[:] = [j for j in _png_jobs if not j.done()]
+    _png_jobs.append(_png_pool.submit(plt.imsave, out_path, img, cmap=cmap))
 
 
 def load_manifest(base_dir: str) -> Dict[str, Any]:
-    """Load manifest.json if exists, else return empty dict."""
+    """
+    Read manifest.jsonl, folding records by event id, else return empty dict.
+    """
+    f = _manifest_files.get(base_dir)
+    if f is not None:
+        f.flush()
     path = _manifest_path(base_dir)
+    events: Dict[str, Dict[str, Any]] = {}
     if path.exists():
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    else:
-        return {"events": []}
+        with open(path, "rb") as mf:
+            for line in mf:
+                if line.strip():
+                    rec = _loads(line)
+                    events.setdefault(rec["id"], {}).update(rec)
+    return {"events": list(events.values())}
 
 
 def save_manifest(base_dir: str, manifest: Dict[str, Any]):
-    """Write manifest.json to disk."""
+    """Rewrite manifest.jsonl with one line per event."""
+    f = _manifest_files.pop(base_dir, None)
+    if f is not None:
+        f.close()
     path = _manifest_path(base_dir)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    tmp = path.with_suffix(".jsonl.tmp")
+    with open(tmp, "wb") as out:
+        for ev in manifest["events"]:
+            out.write(_dumps(ev) + b"\n")
+    os.replace(tmp, path)
+
+
+def compact(base_dir: str):
+    """Fold follow-up records into their events and rewrite the manifest."""
+    save_manifest(base_dir, load_manifest(base_dir))
 
 
 def save_event(base_dir: str,
@@ -81,26 +223,24 @@ def save_event(base_dir: str,
     Save event metadata (JSON) and update manifest.
     :param base_dir: root output dir
     :param event: dict with event info, e.g. {range, doppler, snr, track_id, timestamp}
-    :param event_id: optional preassigned ID, else UUID4
+    :param event_id: optional preassigned ID, else 16 random hex chars
     :return: event_id used
     """
     _ensure_dirs(base_dir)
-    manifest = load_manifest(base_dir)
 
     if event_id is None:
-        event_id = str(uuid.uuid4())
+        event_id = os.urandom(8).hex()
 
-    # add timestamp if missing
-    if "timestamp" not in event:
-        event["timestamp"] = datetime.datetime.utcnow().isoformat()
+    # add timestamp if missing (UTC, ns since epoch)
+    event.setdefault("timestamp", time.time_ns())
 
     # save JSON
     event_path = Path(base_dir, "events", f"{event_id}.json")
-    with open(event_path, "w", encoding="utf-8") as f:
-        json.dump(event, f, indent=2, ensure_ascii=False)
+    with open(event_path, "wb") as f:
+        f.write(_dumps(event, indent=True))
 
-    # update manifest
-    manifest["events"].append({
+    # append to manifest
+    _append_manifest(base_dir, {
         "id": event_id,
         "file": str(event_path.relative_to(base_dir)),
         "timestamp": event["timestamp"],
@@ -108,7 +248,6 @@ def save_event(base_dir: str,
         "doppler": event.get("doppler"),
         "track_id": event.get("track_id"),
     })
-    save_manifest(base_dir, manifest)
 
     return event_id
 
@@ -125,36 +264,44 @@ def save_patch(base_dir: str,
     :param patch: ndarray [h,w] or [t,h,w]
     :param fmt: "npy" or "png"
     :param cmap: colormap if saving png
-    :return: filename of saved patch
+    :return: filename of saved patch (for npy — the shared patch file)
     """
     _ensure_dirs(base_dir)
-    patch_dir = Path(base_dir, "patches")
-    fname = f"{event_id}.{fmt}"
-    out_path = patch_dir / fname
+    record = {"id": event_id}
 
     if fmt == "npy":
-        np.save(out_path, patch)
+        patch = np.asarray(patch)
+        store = _patch_store(base_dir, patch)
+        record["patch_index"] = store.append(patch)
+        out_path = store.path
     elif fmt == "png":
+        out_path = Path(base_dir, "patches", f"{event_id}.png")
         if patch.ndim == 3:
             # if sequence, plot first frame
             img = patch[0]
         else:
             img = patch
-        plt.imsave(out_path, img, cmap=cmap)
+        _render_png(out_path, np.array(img), cmap)
     else:
         raise ValueError(f"Unsupported patch format {fmt}")
 
-    # update manifest entry
-    manifest = load_manifest(base_dir)
-    for ev in manifest["events"]:
-        if ev["id"] == event_id:
-            ev["patch"] = str(out_path.relative_to(base_dir))
-            break
-    save_manifest(base_dir, manifest)
+    # follow-up manifest record, folded into the event by load_manifest
+    record["patch"] = str(out_path.relative_to(base_dir))
+    _append_manifest(base_dir, record)
 
     return str(out_path)
 
 
+def load_patch(base_dir: str, event_id: str) -> np.ndarray:
+    """Read back an npy patch saved by save_patch."""
+    flush_patches()
+    for ev in load_manifest(base_dir)["events"]:
+        if ev["id"] == event_id and "patch_index" in ev:
+            patches = np.load(Path(base_dir, ev["patch"]), mmap_mode="r")
+            return np.array(patches[ev["patch_index"]])
+    raise KeyError(f"No npy patch for event {event_id}")
+
+
 # Demo usage
 if __name__ == "__main__":
     base = "output_demo"
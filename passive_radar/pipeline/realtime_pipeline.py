@@ -19,12 +19,13 @@ Iter 0: CAF shape=(128, 256), detections=0
 Iter 1: CAF shape=(128, 256), detections=1
  → Target: Doppler=5, Delay=42, Power=27.4
  """
+import itertools
 import logging
 import numpy as np
 
-from passive_radar.capture.kraken_reader import KrakenUDPReader
-from passive_radar.processing.caf import CAFProcessor
-from passive_radar.processing.cfar import CFARProcessor
+from passive_radar.capture.kraken_reader import KrakenUDPReader, RingBuffer
+from passive_radar.caf.caf import CAFProcessor
+from passive_radar.detect.cfar import CACFAR, extract_detections
 
 
 logger = logging.getLogger(__name__)
@@ -33,7 +34,7 @@ logger = logging.getLogger(__name__)
 class RealtimeRadarPipeline:
     """
     Потоковый пассивный радар:
-    - Читает IQ по UDP
+    - Читает IQ по UDP (в отдельном потоке, через RingBuffer)
     - Строит CAF (Cross Ambiguity Function)
     - Применяет CFAR для обнаружения целей
     """
@@ -49,25 +50,41 @@ class RealtimeRadarPipeline:
         doppler_bins=128,
         delay_bins=256,
         cfar_threshold=20.0,
+        n_acc=1,
+        caf=None,
+        plan_flags=("FFTW_MEASURE",),
     ):
+        """
+        :param caf: готовый CAFProcessor (общий с другими пайплайнами /
+            со своими планами); по умолчанию создаётся свой
+        :param plan_flags: флаги FFTW для собственного CAFProcessor
+        """
         self.reader = KrakenUDPReader(
             ip=udp_ip,
             port=udp_port,
             dtype=np.complex64,
             chunk_samples=chunk_samples,
         )
-
-        self.caf = CAFProcessor(
-            sample_rate=sample_rate,
-            n_doppler=doppler_bins,
-            n_delay=delay_bins,
-        )
-
-        self.cfar = CFARProcessor(
-            threshold=cfar_threshold,
-            guard_cells=2,
-            training_cells=8,
-        )
+        # Приём идёт параллельно с CAF/CFAR, пакеты не теряются при расчёте
+        self.rx = RingBuffer(self.reader, n_acc=n_acc)
+
+        frame_samples = chunk_samples * n_acc
+        if caf is None:
+            # Кадр делится на doppler_bins сегментов (не короче delay_bins)
+            caf = CAFProcessor(
+                sample_rate=sample_rate,
+                block_size=max(delay_bins, frame_samples // doppler_bins),
+                doppler_bins=doppler_bins,
+                delay_bins=delay_bins,
+                plan_flags=plan_flags,
+            )
+        self.caf = caf
+        # Планы FFTW и рабочие буферы создаются здесь, один раз на все кадры
+        self.caf.warmup(frame_samples)
+
+        # alpha и окно CFAR считаются один раз, apply() — на каждый кадр
+        self.cfar = CACFAR(guard_cells=(2, 2), ref_cells=(8, 8))
+        self.cfar_threshold = cfar_threshold
 
         self.ref_channel = ref_channel
         self.echo_channel = echo_channel
@@ -80,10 +97,11 @@ class RealtimeRadarPipeline:
         :param max_iters: ограничить количество шагов (None = бесконечно)
         """
         logger.info("Starting realtime passive radar pipeline...")
-        self.reader.start()
+        self.rx.start()
 
         try:
-            for i, iq in enumerate(self.reader.stream()):
+            for i in itertools.count():
+                iq = self.rx.get().reshape(-1)  # кадр из n_acc блоков подряд
                 # IQ: [N] или [N,channels] в зависимости от формата DAQ
                 # Если DAQ передает каналы подряд — тут потребуется reshape
                 # Для простоты считаем, что у нас 2 канала: ref и echo
@@ -96,20 +114,27 @@ class RealtimeRadarPipeline:
                     echo = iq[:, self.echo_channel]
 
                 # CAF
-                caf_map = self.caf.compute(ref, echo)
+                caf_map = self.caf.compute_caf(ref, echo)
 
                 # CFAR
-                detections = self.cfar.detect(caf_map)
+                det_map, _ = self.cfar.apply(caf_map)
+                detections = extract_detections(
+                    det_map, caf_map, threshold=self.cfar_threshold)
 
                 # Вывод
-                logger.info(f"Iter {i}: CAF shape={caf_map.shape}, detections={len(detections)}")
-                if detections:
+                # (ленивое %-форматирование: при выключенном INFO строка
+                # не собирается)
+                logger.info("Iter %d: CAF shape=%s, detections=%d",
+                            i, caf_map.shape, len(detections))
+                if len(detections) and logger.isEnabledFor(logging.INFO):
                     for (dop, delay, power) in detections:
-                        logger.info(f" → Target: Doppler={dop}, Delay={delay}, Power={power:.2f}")
+                        logger.info(" → Target: Doppler=%s, Delay=%s, "
+                                    "Power=%.2f", dop, delay, power)
 
                 if max_iters and i >= max_iters:
                     break
 
         finally:
-            self.reader.stop()
-            logger.info("Pipeline stopped")
+            self.rx.stop()
+            logger.info("Pipeline stopped (dropped frames: %d)",
+                        self.rx.dropped)
@@ -22,9 +22,10 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 
-from passive_radar.capture.kraken_reader import KrakenUDPReader
-from passive_radar.processing.caf import CAFProcessor
-from passive_radar.processing.cfar import CFARProcessor
+from passive_radar.capture.kraken_reader import KrakenUDPReader, RingBuffer
+from passive_radar.caf.caf import CAFProcessor
+from passive_radar.detect.cfar import CACFAR, extract_detections
+from passive_radar.tools.utils import db20
 
 
 logger = logging.getLogger(__name__)
@@ -48,26 +49,29 @@ class RealtimeRadarPlot:
             dtype=np.complex64,
             chunk_samples=chunk_samples,
         )
+        # Приём в отдельном потоке: отрисовка не блокирует чтение сокета
+        self.rx = RingBuffer(self.reader)
 
         self.caf = CAFProcessor(
             sample_rate=sample_rate,
-            n_doppler=doppler_bins,
-            n_delay=delay_bins,
+            block_size=max(delay_bins, chunk_samples // doppler_bins),
+            doppler_bins=doppler_bins,
+            delay_bins=delay_bins,
         )
 
-        self.cfar = CFARProcessor(
-            threshold=cfar_threshold,
-            guard_cells=2,
-            training_cells=8,
-        )
+        # alpha и окно CFAR считаются один раз, apply() — на каждый кадр
+        self.cfar = CACFAR(guard_cells=(2, 2), ref_cells=(8, 8))
+        self.cfar_threshold = cfar_threshold
 
-        # Матрица CAF
-        self.caf_map = np.zeros((doppler_bins, delay_bins))
+        # Матрица CAF и буфер её dB-представления (общие для всех кадров)
+        self.caf_map = np.zeros((doppler_bins, self.caf.delay_bins),
+                                dtype=np.float32)
+        self._dbbuf = np.empty_like(self.caf_map)
 
         # Настраиваем фигуру
         self.fig, self.ax = plt.subplots(figsize=(8, 6))
         self.img = self.ax.imshow(
-            20 * np.log10(np.abs(self.caf_map) + 1e-12),
+            self._to_db(self.caf_map),
             aspect="auto",
             origin="lower",
             cmap="viridis",
@@ -79,8 +83,18 @@ class RealtimeRadarPlot:
 
         self.scatter = self.ax.scatter([], [], marker="x", color="red")
 
+    def _to_db(self, caf_map):
+        """
+        20·log10(|caf| + 1e-12) в предвыделенный float32 буфер,
+        одним проходом.
+        """
+        return db20(caf_map, out=self._dbbuf)
+
     def update_frame(self, frame):
-        iq = next(self.reader.stream())
+        frame_iq = self.rx.get(timeout=1.0)
+        if frame_iq is None:
+            return self.img, self.scatter  # нового кадра нет
+        iq = frame_iq.reshape(-1)
 
         # Разбиваем на ref и echo (если 2 канала)
         if iq.ndim == 1:
@@ -91,26 +105,24 @@ class RealtimeRadarPlot:
             echo = iq[:, 1]
 
         # CAF
-        self.caf_map = self.caf.compute(ref, echo)
+        self.caf_map = self.caf.compute_caf(ref, echo)
 
         # CFAR
-        detections = self.cfar.detect(self.caf_map)
+        det_map, _ = self.cfar.apply(self.caf_map)
+        detections = extract_detections(det_map, self.caf_map,
+                                        threshold=self.cfar_threshold)
 
         # Обновляем картинку
-        self.img.set_data(20 * np.log10(np.abs(self.caf_map) + 1e-12))
+        self.img.set_data(self._to_db(self.caf_map))
 
-        if detections:
-            xs = [d[1] for d in detections]  # delay
-            ys = [d[0] for d in detections]  # doppler
-            self.scatter.set_offsets(np.c_[xs, ys])
-        else:
-            self.scatter.set_offsets([])
+        # (delay, doppler); (0, 2) если целей нет
+        self.scatter.set_offsets(detections[:, [1, 0]])
 
-        logger.info(f"Frame: detections={len(detections)}")
+        logger.info("Frame: detections=%d", len(detections))
         return self.img, self.scatter
 
     def run(self):
-        self.reader.start()
+        self.rx.start()
         ani = animation.FuncAnimation(
             self.fig,
             self.update_frame,
@@ -118,7 +130,7 @@ class RealtimeRadarPlot:
             blit=False,
         )
         plt.show()
-        self.reader.stop()
+        self.rx.stop()
 
 
 if __name__ == "__main__":
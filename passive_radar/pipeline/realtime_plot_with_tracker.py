@@ -9,7 +9,7 @@ Requirements:
 - numpy
 - passive_radar.capture.kraken_reader.KrakenUDPReader
 - passive_radar.caf.caf.CAFProcessor
-- passive_radar.detect.cfar.cfar_2d / or CFARProcessor wrapper
+- passive_radar.detect.cfar.CACFAR (CA-CFAR with reusable output maps)
 - passive_radar.track.tracker.Tracker  (the Kalman+Hungarian tracker implemented earlier)
 
 Run:
@@ -28,7 +28,9 @@ Run:
 
 цветные точки/треки и ID для каждого активного трека.
 
-В демо-пайплайне CAF строится из одного чанка (как compute_caf_block(iq, iq)), а доплер-ось временно симулируется (в реальной системе CAF → RD требует накопления нескольких блоков и FFT по времени). После интеграции с реальным CAFProcessor замените _process_iq_to_caf на вызовы, которые накапливают несколько блоков и вычисляют настоящую RD-карту.
+В демо-пайплайне CAF строится по каждому чанку (как compute_caf_block(iq, iq));
+доплер-ось получается FFT по медленному времени из последних doppler_bins
+профилей (кольцевой буфер), пока буфер не заполнен — кадры пропускаются.
 
 Параметры, которые можно подстроить: cfar_guard, cfar_ref, pfa, track_dt, dist_threshold в трекере.
 
@@ -40,13 +42,13 @@ import logging
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
-import matplotlib.cm as cm
 import time
-from collections import defaultdict, deque
+from collections import defaultdict
 
 from passive_radar.capture.kraken_reader import KrakenUDPReader
-from passive_radar.caf.caf import CAFProcessor
-from passive_radar.detect.cfar import cfar_2d, extract_detections
+from passive_radar.caf.caf import CAFProcessor, SlowTimeRD
+from passive_radar.detect.cfar import CACFAR, extract_detections
+from passive_radar.tools.utils import db20
 from passive_radar.track.tracker import Tracker  # assumes Tracker is defined as before
 
 logger = logging.getLogger(__name__)
@@ -82,6 +84,7 @@ class RealtimeRadarPlotWithTracker:
         self.cfar_guard = cfar_guard
         self.cfar_ref = cfar_ref
         self.pfa = pfa
+        self.cfar = CACFAR(guard_cells=cfar_guard, ref_cells=cfar_ref, pfa=pfa)
 
         # Tracker
         self.tracker = Tracker(dt=track_dt, dist_threshold=12.0, max_missed=5)
@@ -91,15 +94,29 @@ class RealtimeRadarPlotWithTracker:
         self.doppler_bins = doppler_bins
 
         # Initialize CAF map (doppler x delay)
-        self.caf_map = np.zeros((self.doppler_bins, self.delay_bins))
+        self.caf_map = np.zeros((self.doppler_bins, self.delay_bins),
+                                dtype=np.float32)
+
+        # RD map: doppler via FFT over the last doppler_bins CAF profiles
+        self.rd = SlowTimeRD(self.doppler_bins, self.delay_bins,
+                             fft_workers=self.caf.fft_workers)
+
+        # Per-frame buffers, allocated once and reused (dB image, clim scratch)
+        shape = (self.doppler_bins, self.delay_bins)
+        self._vis = np.empty(shape, dtype=np.float32)
+        # scratch for the 5th / 99th percentile clim (via np.partition)
+        self._part = np.empty(self._vis.size, dtype=np.float32)
+        self._clim_k = (int(0.05 * self._part.size),
+                        int(0.99 * self._part.size))
 
         # Tracking history: store last N positions per track id for plotting trails
         self.trail_len = 20
-        self.trails = defaultdict(lambda: deque(maxlen=self.trail_len))
+        self.trails = defaultdict(self._new_trail)
 
         # Color map for tracks
-        self.colors = {}
-        self.colormap = cm.get_cmap("tab20")
+        # (20 RGBA rows computed once; the color depends only on the id)
+        self.colormap = plt.get_cmap("tab20")
+        self._palette = self.colormap(np.arange(20))
 
         # Matplotlib setup
         self.fig, self.ax = plt.subplots(figsize=(10, 6))
@@ -109,13 +126,18 @@ class RealtimeRadarPlotWithTracker:
             origin="lower",
             cmap="viridis",
             interpolation="nearest",
+            animated=True,
         )
+        # Limits fixed to the image, so new track artists never rescale the
+        # axes (blitting)
+        self.ax.set_autoscale_on(False)
         self.ax.set_title("Realtime Passive Radar (CAF + CFAR + Tracker)")
         self.ax.set_xlabel("Delay bins")
         self.ax.set_ylabel("Doppler bins")
 
         # Detections scatter
-        self.scatter = self.ax.scatter([], [], marker="x", color="red", s=40, label="CFAR")
+        self.scatter = self.ax.scatter([], [], marker="x", color="red", s=40,
+                                       label="CFAR", animated=True)
 
         # Track artists (will be a dict of Line2D objects and text labels)
         self.track_lines = {}
@@ -125,49 +147,52 @@ class RealtimeRadarPlotWithTracker:
         # Legend
         self.ax.legend(loc="upper right")
 
+    def _new_trail(self):
+        """
+        Trail storage as two float32 arrays (x, y) ordered oldest → newest,
+        n = filled length.
+        """
+        return {"x": np.empty(self.trail_len, np.float32),
+                "y": np.empty(self.trail_len, np.float32),
+                "n": 0}
+
+    def _push_trail(self, trail, x, y):
+        """
+        Append a point in place; when full, shift by one
+        (a memmove of trail_len floats).
+        """
+        n = trail["n"]
+        if n == self.trail_len:
+            trail["x"][:-1] = trail["x"][1:]
+            trail["y"][:-1] = trail["y"][1:]
+            n -= 1
+        trail["x"][n] = x
+        trail["y"][n] = y
+        trail["n"] = n + 1
+        return trail["x"][:n + 1], trail["y"][:n + 1]
+
     def _assign_color(self, tid):
         """Assign consistent color per track id."""
-        if tid not in self.colors:
-            idx = (tid - 1) % 20
-            self.colors[tid] = self.colormap(idx)
-        return self.colors[tid]
+        return self._palette[(tid - 1) % 20]
 
     def _process_iq_to_caf(self, iq_chunk):
         """
-        Convert single IQ chunk(s) to a CAF map.
-        For demo we compute CAF block and then a very small doppler stacking to form a 2D map,
-        because full RD mapping often requires a stream of blocks.
+        Accumulate CAF delay profiles over doppler_bins chunks and FFT them
+        along slow time into the RD map. Returns None until the ring is full.
         """
-
-        # If iq_chunk is complex array 1D, compute a CAF block and replicate (quick demo)
-        # compute_caf_block returns 1D array (delay dimension)
+        # compute_caf_block returns a complex 1D delay profile
         caf_block = self.caf.compute_caf_block(iq_chunk, iq_chunk)  # self-correlation as placeholder
-        # take magnitude and resize to desired delay_bins
-        delay = np.abs(caf_block)
-        # reduce/extend delay to desired delay_bins
-        if delay.size >= self.delay_bins:
-            delay = delay[: self.delay_bins]
-        else:
-            pad = np.zeros(self.delay_bins - delay.size)
-            delay = np.concatenate([delay, pad])
-
-        # Create a doppler axis by short-time FFT along a tiny buffer.
-        # For realtime demo, we just tile the delay vector across doppler_bins and add slight random phase to simulate doppler variation.
-        rd = np.tile(delay, (self.doppler_bins, 1))
-        # add tiny doppler-like variation for visual interest (remove in real implementation)
-        noise = np.random.randn(*rd.shape) * 0.01 * np.max(rd + 1e-12)
-        rd = rd + noise
-        return rd
+        return self.rd.push(caf_block)
 
     def _run_cfar_on_rd(self, rdmap):
         """
         Run CFAR on RD map and return list of detections (doppler_idx, delay_idx, power).
-        We'll use a simple approach: run cfar_2d row-wise or use provided 2D CFAR.
+        CFAR runs through the persistent CACFAR detector
+        (its output maps are reused per frame).
         """
-        # reuse the cfar_2d function expecting rdmap shape (doppler, delay)
-        det_map, thr_map = cfar_2d(rdmap, guard_cells=self.cfar_guard, ref_cells=self.cfar_ref, pfa=self.pfa)
+        det_map, thr_map = self.cfar.apply(rdmap)
         dets = extract_detections(det_map, rdmap, threshold=0)
-        # dets is list of (doppler, range, power)
+        # dets is ndarray (K, 3) of (doppler, range, power)
         return dets
 
     def update_frame(self, frame):
@@ -183,34 +208,36 @@ class RealtimeRadarPlotWithTracker:
         # For multi-channel DAQ, reshape appropriately. We assume single-channel complex array here.
         # Compute a quick RD map from the chunk:
         rdmap = self._process_iq_to_caf(iq)
+        if rdmap is None:
+            # no real doppler yet: skip CFAR/tracker, don't fabricate a map
+            return self.img,
 
         # Save the CAF map for visualization
         # Optionally apply normalization / smoothing
-        vis_map = 20 * np.log10(np.abs(rdmap) + 1e-12)
+        # fused 20·log10(|rd| + eps), one pass
+        vis_map = db20(rdmap, out=self._vis)
         self.img.set_data(vis_map)
-        self.img.set_clim(np.percentile(vis_map, 5), np.percentile(vis_map, 99))
+        # two order statistics via an in-place O(N) partition, no full sorts
+        self._part[:] = vis_map.ravel()
+        self._part.partition(self._clim_k)
+        lo, hi = self._clim_k
+        self.img.set_clim(self._part[lo], self._part[hi])
 
         # CFAR detections
-        dets = self._run_cfar_on_rd(rdmap)  # list of tuples (doppler, delay, power)
+        # ndarray rows (doppler, delay, power)
+        dets = self._run_cfar_on_rd(rdmap)
 
-        # Prepare detections for tracker: convert to (range_idx, doppler_idx, power)
-        detections_for_tracker = []
-        for dop, rng, power in dets:
-            # convert indices: tracker expects (r_idx, d_idx, power)
-            # here r_idx = rng (delay index), d_idx = dop (doppler index)
-            detections_for_tracker.append((float(rng), float(dop), float(power)))
+        # Tracker expects (range_idx, doppler_idx, power): reorder columns,
+        # with no per-value float()
+        detections_for_tracker = dets[:, [1, 0, 2]]
 
         # Update tracker with detections
         tracks = self.tracker.update(detections_for_tracker, timestamp=time.time())
 
         # Update trails and graphics
         # First: plot CFAR detections
-        if dets:
-            xs = [d[1] for d in dets]  # delay
-            ys = [d[0] for d in dets]  # doppler
-            self.scatter.set_offsets(np.c_[xs, ys])
-        else:
-            self.scatter.set_offsets([])
+        # (delay, doppler); (0, 2) если целей нет
+        self.scatter.set_offsets(dets[:, [1, 0]])
 
         # Update / create track artists
         current_ids = set()
@@ -222,19 +249,20 @@ class RealtimeRadarPlotWithTracker:
             y = float(tr.state[1])  # doppler index
 
             # update trail
-            self.trails[tid].append((x, y))
-
-            # line for trail
-            xs_trail = [p[0] for p in self.trails[tid]]
-            ys_trail = [p[1] for p in self.trails[tid]]
+            # (array views go straight to the line artist, no per-point lists)
+            xs_trail, ys_trail = self._push_trail(self.trails[tid], x, y)
 
             color = self._assign_color(tid)
 
             # create line artist if missing
             if tid not in self.track_lines:
-                (line,) = self.ax.plot(xs_trail, ys_trail, "-", color=color, linewidth=2, label=f"Track {tid}")
-                dot = self.ax.plot(x, y, "o", color=color, markersize=6)[0]
-                txt = self.ax.text(x + 1, y + 1, f"{tid}", color=color, fontsize=9)
+                (line,) = self.ax.plot(xs_trail, ys_trail, "-", color=color,
+                                       linewidth=2, label=f"Track {tid}",
+                                       animated=True)
+                dot = self.ax.plot(x, y, "o", color=color, markersize=6,
+                                   animated=True)[0]
+                txt = self.ax.text(x + 1, y + 1, f"{tid}", color=color,
+                                   fontsize=9, animated=True)
                 self.track_lines[tid] = line
                 self.track_dots[tid] = dot
                 self.track_texts[tid] = txt
@@ -262,18 +290,21 @@ class RealtimeRadarPlotWithTracker:
                 if tid in self.trails:
                     del self.trails[tid]
 
-        # redraw legend to include tracks (only once)
-        # (avoid creating huge legends each frame)
-        self.ax.relim()
-        self.ax.autoscale_view()
+        # Axis limits stay at the image bounds, so nothing forces a full
+        # redraw:
+        # with blitting only the returned (animated) artists are redrawn
 
-        logger.info(f"Frame updated. Detections: {len(detections_for_tracker)}, Tracks: {len(tracks)}")
-        return (self.img, self.scatter) + tuple(self.track_lines.values())
+        logger.info("Frame updated. Detections: %d, Tracks: %d",
+                    len(detections_for_tracker), len(tracks))
+        return (self.img, self.scatter, *self.track_lines.values(),
+                *self.track_dots.values(), *self.track_texts.values())
 
     def run(self):
         """Start the reader and run the matplotlib animation loop."""
         self.reader.start()
-        ani = animation.FuncAnimation(self.fig, self.update_frame, interval=200, blit=False)
+        # keep a reference, or the FuncAnimation may be garbage-collected
+        self.ani = animation.FuncAnimation(self.fig, self.update_frame,
+                                           interval=200, blit=True)
         plt.show()
         self.reader.stop()
 
@@ -43,6 +43,7 @@ Headless (realtime_server.py) для Raspberry Pi + WebSocket-выдачи.
 """
 
 import asyncio
+import concurrent.futures
 import json
 import time
 import logging
@@ -52,10 +53,28 @@ import argparse
 import websockets
 
 from passive_radar.capture.kraken_reader import KrakenUDPReader
-from passive_radar.caf.caf import CAFProcessor
-from passive_radar.detect.cfar import cfar_2d, extract_detections
+from passive_radar.caf.caf import CAFProcessor, SlowTimeRD
+from passive_radar.detect.cfar import CACFAR, extract_detections
 from passive_radar.track.tracker import Tracker
 
+try:
+    import orjson
+
+    def _dumps(obj) -> str:
+        # numpy scalars/arrays are serialized natively
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+except ImportError:
+    def _np_default(obj):
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        if isinstance(obj, np.generic):
+            return obj.item()
+        raise TypeError(f"Object of type {type(obj).__name__} "
+                        "is not JSON serializable")
+
+    def _dumps(obj) -> str:
+        return json.dumps(obj, default=_np_default)
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("RealtimeServer")
 
@@ -90,6 +109,8 @@ class RealtimeRadarServer:
         self.cfar_guard = cfar_guard
         self.cfar_ref = cfar_ref
         self.pfa = pfa
+        # alpha and the det/thr maps are set up once and reused every frame
+        self.cfar = CACFAR(guard_cells=cfar_guard, ref_cells=cfar_ref, pfa=pfa)
 
         # Tracker
         self.tracker = Tracker(dt=track_dt, dist_threshold=12.0, max_missed=5)
@@ -97,6 +118,14 @@ class RealtimeRadarServer:
         # Buffers
         self.doppler_bins = doppler_bins
         self.delay_bins = delay_bins
+        # doppler = FFT over slow time, on the CAF processor's FFT threads
+        self.rd = SlowTimeRD(doppler_bins, delay_bins,
+                             fft_workers=self.caf.fft_workers)
+
+        # Receive + CAF/CFAR/tracker run on one worker thread so the event loop
+        # keeps serving websocket clients (FFT/numba release the GIL)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="radar-dsp")
 
         # WebSocket
         self.ws_port = ws_port
@@ -105,26 +134,25 @@ class RealtimeRadarServer:
     def _process_chunk(self, iq):
         """Compute CAF → RD map → CFAR → tracker"""
         caf_block = self.caf.compute_caf_block(iq, iq)
-        delay = np.abs(caf_block)
-        if delay.size >= self.delay_bins:
-            delay = delay[: self.delay_bins]
-        else:
-            pad = np.zeros(self.delay_bins - delay.size)
-            delay = np.concatenate([delay, pad])
-
-        rd = np.tile(delay, (self.doppler_bins, 1))
-        rd += np.random.randn(*rd.shape) * 0.01 * np.max(rd + 1e-12)
-
-        det_map, thr_map = cfar_2d(
-            rd, guard_cells=self.cfar_guard, ref_cells=self.cfar_ref, pfa=self.pfa
-        )
-        dets = extract_detections(det_map, rd, threshold=0)
+        rd = self.rd.push(caf_block)
+        if rd is None:
+            # doppler_bins profiles not accumulated yet: nothing to detect
+            return np.empty((0, 3), dtype=np.float32), []
+
+        dets = self._run_cfar_on_rd(rd)
 
-        detections_for_tracker = [(float(r), float(d), float(p)) for d, r, p in dets]
-        tracks = self.tracker.update(detections_for_tracker, timestamp=time.time())
+        # (doppler, range, power) → tracker columns (range, doppler, power)
+        # without per-value boxing
+        tracks = self.tracker.update(dets[:, [1, 0, 2]],
+                                     timestamp=time.time())
 
         return dets, tracks
 
+    def _run_cfar_on_rd(self, rdmap):
+        """CA-CFAR on the RD map → ndarray (K, 3) of (doppler, range, power)"""
+        det_map, _ = self.cfar.apply(rdmap)
+        return extract_detections(det_map, rdmap, threshold=0)
+
     async def _ws_handler(self, websocket, path):
         self.clients.add(websocket)
         try:
@@ -133,47 +161,55 @@ class RealtimeRadarServer:
         finally:
             self.clients.remove(websocket)
 
-    async def _broadcast(self, message: dict):
+    def _broadcast(self, message: dict):
+        """
+        Fire-and-forget send to all clients: a slow client can't stall
+        the frame loop
+        """
         if self.clients:
-            msg = json.dumps(message)
-            await asyncio.gather(*[ws.send(msg) for ws in self.clients])
+            # serialized once, the same text frame goes to every client
+            websockets.broadcast(self.clients, _dumps(message))
 
     async def run(self):
-        logger.info(f"Starting UDP reader on {self.reader.ip}:{self.reader.port}")
+        logger.info("Starting UDP reader on %s:%s",
+                    self.reader.ip, self.reader.port)
         self.reader.start()
 
-        logger.info(f"Starting WebSocket server on port {self.ws_port}")
+        logger.info("Starting WebSocket server on port %s", self.ws_port)
         ws_server = await websockets.serve(self._ws_handler, "0.0.0.0", self.ws_port)
 
+        loop = asyncio.get_running_loop()
+        stream = self.reader.stream()
         try:
             while True:
-                iq = next(self.reader.stream())
-                dets, tracks = self._process_chunk(iq)
+                iq = await loop.run_in_executor(self._executor, next,
+                                                stream, None)
+                if iq is None:
+                    break
+                dets, tracks = await loop.run_in_executor(
+                    self._executor, self._process_chunk, iq)
 
                 # Формируем JSON
                 payload = {
                     "timestamp": time.time(),
                     "detections": [
-                        {"doppler": float(d), "range": float(r), "power": float(p)}
-                        for d, r, p in dets
+                        {"doppler": d, "range": r, "power": p}
+                        for d, r, p in dets.tolist()
                     ],
                     "tracks": [
-                        {
-                            "id": tr.id,
-                            "range": float(tr.state[0]),
-                            "doppler": float(tr.state[1]),
-                            "vr": float(tr.state[2]),
-                            "vd": float(tr.state[3]),
-                        }
+                        {"id": tr.id, "range": r, "doppler": d,
+                         "vr": vr, "vd": vd}
                         for tr in tracks
+                        for r, d, vr, vd in (tr.state.tolist(),)
                     ],
                 }
 
-                await self._broadcast(payload)
+                self._broadcast(payload)
         except KeyboardInterrupt:
             logger.info("Shutting down server...")
         finally:
             self.reader.stop()
+            self._executor.shutdown(wait=False)
             ws_server.close()
             await ws_server.wait_closed()
 
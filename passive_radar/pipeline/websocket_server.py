@@ -6,25 +6,39 @@ from datetime import datetime
 
 WS_URL = "ws://raspberrypi:8765"  # адрес твоего WebSocket сервера
 
+LOG_FILE = "tracks.log"
+LOG_BUFFER = 1 << 16  # bytes buffered before tracks.log hits the disk
+FLUSH_EVERY = 50      # messages between explicit flushes
+
 async def listen():
-    async with websockets.connect(WS_URL) as ws:
-        print(f"Connected to {WS_URL}")
-        while True:
-            try:
-                msg = await ws.recv()
-                data = json.loads(msg)
-                ts = datetime.utcnow().isoformat()
-                print(f"[{ts}] Track received: {data}")
-                
-                # Пишем в файл
-                with open("tracks.log", "a", encoding="utf-8") as f:
-                    f.write(f"{ts} {json.dumps(data)}\n")
+    # Лог открывается один раз на соединение, а не на каждое сообщение
+    f = open(LOG_FILE, "a", buffering=LOG_BUFFER, encoding="utf-8")
+    try:
+        async with websockets.connect(WS_URL) as ws:
+            print(f"Connected to {WS_URL}")
+            n = 0
+            while True:
+                try:
+                    msg = await ws.recv()
+                    data = json.loads(msg)
+                    ts = datetime.utcnow().isoformat()
+                    print(f"[{ts}] Track received: {data}")
+
+                    # Пишем в файл как пришло: сообщение уже JSON
+                    if isinstance(msg, bytes):
+                        msg = msg.decode("utf-8")
+                    f.write(f"{ts} {msg}\n")
+                    n += 1
+                    if n % FLUSH_EVERY == 0:
+                        f.flush()
 
-            except websockets.exceptions.ConnectionClosed:
-                print("Connection closed by server")
-                break
-            except Exception as e:
-                print(f"Error: {e}")
+                except websockets.exceptions.ConnectionClosed:
+                    print("Connection closed by server")
+                    break
+                except Exception as e:
+                    print(f"Error: {e}")
+    finally:
+        f.close()
 
 if __name__ == "__main__":
     asyncio.run(listen())
@@ -9,44 +9,83 @@ label_regions() — нумерует все выделенные объекты
 
 import numpy as np
 from scipy import ndimage
-from skimage.morphology import binary_opening, binary_closing, remove_small_objects
+
+
+def _square_struct(size: int) -> np.ndarray:
+    """
+    Квадратный структурный элемент size×size.
+
+    Чётный размер дополняется нулевой строкой/столбцом в конце до нечётного —
+    так же, как это делает skimage (pad_footprint), поэтому центр и сдвиг
+    результата совпадают с прежней реализацией.
+    """
+    k = size + (1 - size % 2)
+    struct = np.zeros((k, k), dtype=bool)
+    struct[:size, :size] = True
+    return struct
 
 
 def morph_clean(detection_map: np.ndarray,
                 min_size: int = 5,
                 structure_size: int = 3,
                 perform_opening: bool = True,
-                perform_closing: bool = True) -> np.ndarray:
+                perform_closing: bool = True,
+                return_labels: bool = False):
     """
     Морфологическая очистка бинарной карты обнаружений.
 
+    Открытие/закрытие — напрямую через scipy.ndimage (без проверок и копий
+    skimage), мелкие объекты убираются по той же разметке ndimage.label,
+    которую можно сразу получить вместо отдельного вызова label_regions().
+
     Args:
         detection_map (np.ndarray): бинарная карта (0/1) после CFAR.
         min_size (int): минимальный размер объекта для сохранения (меньшие будут удалены).
         structure_size (int): размер структурного элемента (квадрат).
         perform_opening (bool): применять ли морфологическое открытие.
         perform_closing (bool): применять ли морфологическое закрытие.
+        return_labels (bool): вернуть также разметку областей (labels, num).
 
     Returns:
-        np.ndarray: очищенная бинарная карта.
+        np.ndarray: очищенная бинарная карта;
+        при return_labels=True — (карта, labels, num), как у label_regions().
     """
     # Преобразуем в булев тип
     mask = detection_map.astype(bool)
 
     # Структурный элемент (квадрат)
-    struct = np.ones((structure_size, structure_size), dtype=bool)
+    struct = _square_struct(structure_size)
 
-    # Морфологическое открытие (удаление шумных пикселей)
+    # Морфологическое открытие (удаление шумных пикселей). Граница как в
+    # skimage: эрозия считает внешние пиксели единицами, дилатация — нулями
     if perform_opening:
-        mask = binary_opening(mask, struct)
+        mask = ndimage.binary_erosion(mask, struct, border_value=1)
+        mask = ndimage.binary_dilation(mask, struct, border_value=0)
 
     # Морфологическое закрытие (заполнение дыр)
     if perform_closing:
-        mask = binary_closing(mask, struct)
-
-    # Удаляем слишком маленькие объекты
-    mask = remove_small_objects(mask, min_size=min_size)
-
+        mask = ndimage.binary_dilation(mask, struct, border_value=0)
+        mask = ndimage.binary_erosion(mask, struct, border_value=1)
+
+    # Удаляем слишком маленькие объекты по одной разметке
+    labels, num = ndimage.label(mask)
+    if min_size and num:
+        sizes = np.bincount(labels.ravel())
+        small = sizes < min_size
+        small[0] = False
+        if small.any():
+            drop = small[labels]
+            mask[drop] = False
+            if return_labels:
+                # перенумерация оставшихся областей подряд, как у ndimage.label
+                keep = np.flatnonzero(~small[1:]) + 1
+                remap = np.zeros(sizes.size, dtype=labels.dtype)
+                remap[keep] = np.arange(1, keep.size + 1, dtype=labels.dtype)
+                labels = remap[labels]
+                num = int(keep.size)
+
+    if return_labels:
+        return mask.astype(np.uint8), labels, num
     return mask.astype(np.uint8)
 
 
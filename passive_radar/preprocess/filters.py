@@ -12,8 +12,9 @@ fir_highpass → убирает низкочастотный шум/дрифт.
 normalize → нормализация мощности.
 """
 
+import functools
 import numpy as np
-from scipy.signal import lfilter, firwin
+from scipy.signal import firwin, oaconvolve, lfilter, lfilter_zi
 
 
 def mti_filter(data: np.ndarray, delay: int = 1) -> np.ndarray:
@@ -24,7 +25,7 @@ def mti_filter(data: np.ndarray, delay: int = 1) -> np.ndarray:
     Parameters
     ----------
     data : np.ndarray
-        Input IQ or magnitude data (1D or 2D).
+        Input IQ or magnitude data (any ndim, time along the first axis).
     delay : int
         Number of samples/rows to delay.
 
@@ -33,15 +34,19 @@ def mti_filter(data: np.ndarray, delay: int = 1) -> np.ndarray:
     np.ndarray
         MTI-filtered data.
     """
-    if data.ndim == 1:
-        out = np.zeros_like(data)
-        out[delay:] = data[delay:] - data[:-delay]
-    else:  # e.g. 2D: (time, freq)
-        out = np.zeros_like(data)
-        out[delay:, :] = data[delay:, :] - data[:-delay, :]
+    # Срез по первой оси одинаков для 1D, 2D (time, freq) и стопок кадров
+    out = np.empty_like(data)
+    out[:delay] = 0
+    np.subtract(data[delay:], data[:-delay], out=out[delay:])
     return out
 
 
+@functools.lru_cache(maxsize=8)
+def _design_hp(order, cutoff, fs):
+    """FIR high-pass taps (float32), designed once per (order, cutoff, fs)."""
+    return firwin(order, cutoff / (fs / 2), pass_zero=False).astype(np.float32)
+
+
 def fir_highpass(data: np.ndarray, cutoff: float, fs: float, order: int = 101) -> np.ndarray:
     """
     Apply a FIR high-pass filter to suppress low-frequency clutter.
@@ -49,7 +54,7 @@ def fir_highpass(data: np.ndarray, cutoff: float, fs: float, order: int = 101) -
     Parameters
     ----------
     data : np.ndarray
-        Input data (1D or 2D).
+        Input data (1D or 2D), filtered along the first axis (time).
     cutoff : float
         Cutoff frequency in Hz.
     fs : float
@@ -62,16 +67,50 @@ def fir_highpass(data: np.ndarray, cutoff: float, fs: float, order: int = 101) -
     np.ndarray
         Filtered data.
     """
-    # Design filter
-    taps = firwin(order, cutoff / (fs / 2), pass_zero=False)
-    
-    if data.ndim == 1:
-        return lfilter(taps, 1.0, data)
-    else:  # Apply filter along first axis (time)
-        filtered = np.zeros_like(data)
-        for i in range(data.shape[1]):
-            filtered[:, i] = lfilter(taps, 1.0, data[:, i])
-        return filtered
+    taps = _design_hp(order, cutoff, fs)
+
+    # Причинная свёртка (как lfilter) всех столбцов сразу: overlap-add FFT
+    # по оси времени, хвост полной свёртки отбрасывается
+    n = data.shape[0]
+    taps = taps.reshape((-1,) + (1,) * (data.ndim - 1))
+    return oaconvolve(data, taps, mode="full", axes=0)[:n]
+
+
+def fir_highpass_stream(data: np.ndarray, cutoff: float, fs: float,
+                        order: int = 101, state=None):
+    """
+    Streaming FIR high-pass: filter state is carried between blocks, so
+    consecutive calls equal one lfilter call over the concatenated stream
+    with the same initial state, without a start-up transient on every block.
+
+    The first block starts from the steady state for a constant input of
+    data[0] (not from zeros as fir_highpass does), so only the first
+    ``order - 1`` output samples differ from fir_highpass over the whole
+    stream; from there on the outputs are equal.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Block of samples (1D or 2D), time along the first axis.
+    cutoff, fs, order
+        As in fir_highpass.
+    state : np.ndarray or None
+        State returned by the previous call; None for the first block
+        (initialised to the steady state for a constant input of data[0]).
+
+    Returns
+    -------
+    filtered : np.ndarray
+        Filtered block.
+    state : np.ndarray
+        Filter state to pass with the next block.
+    """
+    taps = _design_hp(order, cutoff, fs)
+    if state is None:
+        zi = lfilter_zi(taps, 1.0).reshape((-1,) + (1,) * (data.ndim - 1))
+        state = zi * data[0]
+    # All columns in one C call along the time axis
+    return lfilter(taps, 1.0, data, axis=0, zi=state)
 
 
 def normalize(data: np.ndarray, eps: float = 1e-9) -> np.ndarray:
@@ -46,10 +46,10 @@ def main():
     else:
         raise ValueError(f"Неизвестный режим: {mode}")
 
-    logger.info(f"Старт чтения IQ данных (режим: {mode})...")
+    logger.info("Старт чтения IQ данных (режим: %s)...", mode)
 
     for i, block in enumerate(source):
-        logger.info(f"[{i}] Получен блок: {len(block)} IQ-сэмплов")
+        logger.info("[%d] Получен блок: %d IQ-сэмплов", i, len(block))
         if i >= 10:  # ограничим количество итераций для теста
             break
 
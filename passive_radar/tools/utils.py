@@ -3,6 +3,12 @@ import scipy.signal as signal
 import scipy.ndimage as ndimage
 from sklearn.cluster import DBSCAN
 import logging
+
+try:
+    import numba
+    USE_NUMBA = True
+except ImportError:
+    USE_NUMBA = False
 """
 единый utils.py для всего проекта →  passive_radar/tools/utils.py.
 В него войдут основные функции из файлов:
@@ -41,26 +47,32 @@ def cfar_threshold(signal_power, guard_cells=2, training_cells=8, rate_fa=1e-3):
     """
     Вычисление CFAR-порога для массива мощности сигнала.
     signal_power : 1D numpy array
+
+    Суммы окон берутся из префиксных сумм за O(N) без цикла по ячейкам:
+    опорная область — [i-G-T, i-G) и [i+G, i+G+T), у краёв усекается.
     """
+    signal_power = np.asarray(signal_power)
     n = len(signal_power)
-    threshold = np.zeros(n)
+    # float32 на входе → float32 порог; префиксные суммы копятся в float64
+    out_dtype = np.result_type(signal_power.dtype, np.float32)
 
     # Коэффициент по формуле (для CA-CFAR)
     alpha = training_cells * (rate_fa ** (-1 / training_cells) - 1)
 
-    for i in range(n):
-        start = max(0, i - guard_cells - training_cells)
-        end = min(n, i + guard_cells + training_cells)
-        guard_start = max(0, i - guard_cells)
-        guard_end = min(n, i + guard_cells)
-
-        training_region = np.concatenate(
-            (signal_power[start:guard_start], signal_power[guard_end:end])
-        )
-        noise_level = np.mean(training_region) if len(training_region) > 0 else 0
-        threshold[i] = alpha * noise_level
+    cs = np.zeros(n + 1)
+    np.cumsum(signal_power, dtype=np.float64, out=cs[1:])
+    idx = np.arange(n)
+    start = np.maximum(0, idx - guard_cells - training_cells)
+    end = np.minimum(n, idx + guard_cells + training_cells)
+    guard_start = np.maximum(0, idx - guard_cells)
+    guard_end = np.minimum(n, idx + guard_cells)
 
-    return threshold
+    train_sum = (cs[end] - cs[start]) - (cs[guard_end] - cs[guard_start])
+    train_count = (end - start) - (guard_end - guard_start)
+    noise_level = np.divide(train_sum, train_count, out=np.zeros(n),
+                            where=train_count > 0)
+    noise_level *= alpha
+    return noise_level.astype(out_dtype, copy=False)
 
 
 def detect_peaks_cfar(signal_power, **kwargs):
@@ -93,15 +105,70 @@ def morphological_filter(image, size=3, mode="open"):
 # =========================================================
 # Кластеризация детекций (range, doppler)
 # =========================================================
+DBSCAN_FAST_MAX = 200  # до стольких точек — numba-DBSCAN вместо sklearn
+
+
+if USE_NUMBA:
+    @numba.njit(cache=True)
+    def _dbscan_nb(points, eps, min_samples):
+        """
+        Точный DBSCAN для малых N: соседи за O(N²) без KD-дерева, обход
+        как в sklearn (кластеры нумеруются по первой core-точке, граничная
+        точка достаётся первому дотянувшемуся кластеру).
+        """
+        n = points.shape[0]
+        eps2 = eps * eps
+        adj = np.zeros((n, n), dtype=np.bool_)
+        n_nb = np.zeros(n, dtype=np.int64)
+        for i in range(n):
+            for j in range(n):
+                d2 = 0.0
+                for k in range(points.shape[1]):
+                    diff = points[i, k] - points[j, k]
+                    d2 += diff * diff
+                if d2 <= eps2:
+                    adj[i, j] = True
+                    n_nb[i] += 1
+
+        labels = np.full(n, -1, dtype=np.int64)
+        stack = np.empty(n, dtype=np.int64)
+        label = 0
+        for i in range(n):
+            if labels[i] != -1 or n_nb[i] < min_samples:
+                continue
+            labels[i] = label
+            top = 0
+            stack[top] = i
+            top += 1
+            while top > 0:
+                top -= 1
+                p = stack[top]
+                if n_nb[p] < min_samples:
+                    continue
+                for q in range(n):
+                    if adj[p, q] and labels[q] == -1:
+                        labels[q] = label
+                        stack[top] = q
+                        top += 1
+            label += 1
+        return labels
+
+
 def cluster_detections(points, eps=2.0, min_samples=3):
     """
     Кластеризация точек с помощью DBSCAN.
     points : numpy array (N,2) → [[range, doppler], ...]
-    Возвращает (labels, model)
+    Возвращает (labels, model); для N < DBSCAN_FAST_MAX при наличии numba
+    метки считаются без sklearn и model = None.
     """
     if len(points) == 0:
         return np.array([]), None
 
+    if USE_NUMBA and len(points) < DBSCAN_FAST_MAX:
+        pts = np.ascontiguousarray(points, dtype=np.float64)
+        pts = pts.reshape(len(points), -1)
+        return _dbscan_nb(pts, float(eps), int(min_samples)), None
+
     clustering = DBSCAN(eps=eps, min_samples=min_samples).fit(points)
     labels = clustering.labels_
     return labels, clustering
@@ -110,10 +177,19 @@ def cluster_detections(points, eps=2.0, min_samples=3):
 # =========================================================
 # Общие вспомогательные функции
 # =========================================================
-def normalize(data):
-    """Нормализация массива в [0,1]."""
-    dmin, dmax = np.min(data), np.max(data)
-    return (data - dmin) / (dmax - dmin + 1e-12)
+def normalize(data, out=None):
+    """
+    Нормализация массива в [0,1].
+    out — готовый буфер (например, кадровый self._vis); может совпадать с data.
+    """
+    data = np.asarray(data)
+    if out is None:
+        out = np.empty(data.shape, dtype=np.result_type(data, np.float32))
+    dmin = data.min()
+    scale = 1.0 / (data.max() - dmin + 1e-12)
+    np.subtract(data, dmin, out=out)
+    out *= scale
+    return out
 
 
 def db(x):
@@ -121,6 +197,49 @@ def db(x):
     return 10 * np.log10(np.abs(x) + 1e-12)
 
 
+if USE_NUMBA:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _db20_nb(x, out):
+        """20·log10(|x| + 1e-12) одним проходом по плоским буферам."""
+        for i in numba.prange(x.size):
+            out[i] = 20.0 * np.log10(abs(x[i]) + 1e-12)
+
+
+def db20(x, out=None):
+    """
+    Амплитуда в dB для отображения: 20·log10(|x| + 1e-12).
+
+    С numba — одно чтение x и одна запись out без промежуточных массивов;
+    без неё — цепочка in-place ufunc в out.
+    :param out: готовый float32-буфер формы x (например, кадровый self._vis)
+    """
+    x = np.ascontiguousarray(x)
+    if out is None:
+        out = np.empty(x.shape, dtype=np.float32)
+    if USE_NUMBA and out.flags.c_contiguous:
+        _db20_nb(x.reshape(-1), out.reshape(-1))
+        return out
+    np.abs(x, out=out)
+    out += 1e-12
+    np.log10(out, out=out)
+    out *= 20
+    return out
+
+
 def moving_average(x, N=5):
-    """Простой фильтр скользящего среднего."""
-    return np.convolve(x, np.ones(N)/N, mode="same")
+    """
+    Простой фильтр скользящего среднего (как np.convolve(..., mode="same")).
+    Суммы окон — разности префиксных сумм, O(len(x)) при любом N.
+    """
+    x = np.asarray(x)
+    n = len(x)
+    if N > n:
+        return np.convolve(x, np.ones(N) / N, mode="same")
+    cs = np.zeros(n + 1, dtype=np.result_type(x, np.float64))
+    np.cumsum(x, out=cs[1:])
+    # окно для отсчёта i: [i + off - N + 1, i + off], нули за краями
+    off = (N - 1) // 2
+    idx = np.arange(n)
+    hi = np.minimum(n, idx + off + 1)
+    lo = np.maximum(0, idx + off - N + 1)
+    return (cs[hi] - cs[lo]) / N
@@ -27,10 +27,39 @@ detections — ожидается список кортежей (range_idx, dopp
 from dataclasses import dataclass, field
 import numpy as np
 from scipy.optimize import linear_sum_assignment
+from scipy.spatial import cKDTree
 import itertools
 import time
 from typing import List, Tuple, Optional
 
+try:
+    import numba
+    USE_NUMBA = True
+except ImportError:
+    USE_NUMBA = False
+
+GATE_COST = 1e6  # cost of a gated-out (track, detection) pair
+# from this many detections on, gating uses a cKDTree, not the dense matrix
+KDTREE_MIN_DETS = 32
+
+
+if USE_NUMBA:
+    @numba.njit(cache=True, fastmath=True)
+    def _gated_cost_nb(preds, dets, threshold):
+        """
+        Distance matrix with gating in one pass: squared distance vs
+        threshold², sqrt only inside the gate.
+        """
+        thr2 = threshold * threshold
+        out = np.empty((preds.shape[0], dets.shape[0]))
+        for i in range(preds.shape[0]):
+            for j in range(dets.shape[0]):
+                dr = preds[i, 0] - dets[j, 0]
+                dd = preds[i, 1] - dets[j, 1]
+                d2 = dr * dr + dd * dd
+                out[i, j] = np.sqrt(d2) if d2 <= thr2 else GATE_COST
+        return out
+
 
 @dataclass
 class Track:
@@ -50,14 +79,23 @@ class Track:
         return self.state
 
     def update(self, meas: np.ndarray, H: np.ndarray, R: np.ndarray):
-        """Kalman update with measurement meas (shape (2,))."""
+        """
+        Kalman update with measurement meas (shape (2,)).
+
+        H selects the position [r, d], so H @ x and H @ P are slices and S is
+        2x2: its inverse is written out in closed form instead of
+        np.linalg.inv.
+        """
         z = meas.reshape(2,)
-        y = z - (H @ self.state)               # innovation
-        S = H @ self.P @ H.T + R               # innovation covariance
-        K = self.P @ H.T @ np.linalg.inv(S)    # Kalman gain
+        P = self.P
+        y = z - self.state[:2]                 # innovation (H @ x == x[:2])
+        S = P[:2, :2] + R                      # innovation cov (H P H^T + R)
+        det = S[0, 0] * S[1, 1] - S[0, 1] * S[1, 0]
+        S_inv = np.array([[S[1, 1], -S[0, 1]],
+                          [-S[1, 0], S[0, 0]]]) / det
+        K = P[:, :2] @ S_inv                   # Kalman gain (P H^T S^-1)
         self.state = self.state + K @ y
-        I = np.eye(self.P.shape[0])
-        self.P = (I - K @ H) @ self.P
+        self.P = P - K @ P[:2]                 # (I - K H) P
         self.missed = 0
         self.last_update = time.time()
         # append to history: (timestamp, r, d)
@@ -94,6 +132,9 @@ class Tracker:
         # measurement noise
         self.R = np.eye(2) * meas_var
 
+        # (F, Q) per dt, see _get_F_Q
+        self._FQ_cache = {}
+
     def _build_F_Q(self, dt: float) -> Tuple[np.ndarray, np.ndarray]:
         """Build state transition F and process noise Q for given dt."""
         # constant velocity model: x = [r, d, vr, vd]
@@ -109,13 +150,36 @@ class Tracker:
                       [0, dt**2/2, 0, dt]], dtype=float) * q
         return F, Q
 
+    def _get_F_Q(self, dt: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        F and Q for dt, built once per distinct dt
+        (constant frame rate → one entry).
+        """
+        FQ = self._FQ_cache.get(dt)
+        if FQ is None:
+            FQ = self._FQ_cache[dt] = self._build_F_Q(dt)
+        return FQ
+
     def predict_all(self, dt: Optional[float] = None):
-        """Predict all tracks forward by dt (if None use self.dt)."""
+        """
+        Predict all tracks forward by dt (if None use self.dt).
+
+        States (N, 4) and covariances (N, 4, 4) of all tracks are propagated
+        with one batched matmul each instead of a per-track loop.
+        """
         if dt is None:
             dt = self.dt
-        F, Q = self._build_F_Q(dt)
-        for track in list(self.tracks.values()):
-            track.predict(dt, F, Q)
+        if not self.tracks:
+            return
+        F, Q = self._get_F_Q(dt)
+        tracks = list(self.tracks.values())
+        states = np.stack([t.state for t in tracks]) @ F.T
+        Ps = F @ np.stack([t.P for t in tracks]) @ F.T
+        Ps += Q
+        for track, x, P in zip(tracks, states, Ps):
+            track.state = x
+            track.P = P
+            track.missed += 1  # will be reset on update
 
     def _gate_cost_matrix(self, predictions: np.ndarray, detections: np.ndarray) -> np.ndarray:
         """
@@ -130,10 +194,36 @@ class Tracker:
         dists = np.linalg.norm(predictions[:, None, :] - detections[None, :, :], axis=2)
         return dists
 
+    def _gate_cost_sparse(self, predictions: np.ndarray,
+                          detections: np.ndarray):
+        """
+        Gated cost via a cKDTree over detections: distances only for pairs
+        inside dist_threshold.
+        Returns (cost, rows, cols): dense cost restricted to the
+        tracks/detections that have at least one candidate (GATE_COST
+        elsewhere), plus the original indices of its rows and columns.
+        Assignment on this submatrix matches the one on the full gated matrix.
+        """
+        neighbors = cKDTree(detections).query_ball_point(
+            predictions, r=self.dist_threshold)
+        counts = np.fromiter((len(n) for n in neighbors), dtype=np.intp,
+                             count=len(neighbors))
+        pair_t = np.repeat(np.arange(len(neighbors)), counts)
+        pair_d = np.fromiter(itertools.chain.from_iterable(neighbors),
+                             dtype=np.intp, count=int(counts.sum()))
+
+        rows, r_idx = np.unique(pair_t, return_inverse=True)
+        cols, c_idx = np.unique(pair_d, return_inverse=True)
+        cost = np.full((rows.size, cols.size), GATE_COST)
+        diff = predictions[pair_t] - detections[pair_d]
+        cost[r_idx, c_idx] = np.hypot(diff[:, 0], diff[:, 1])
+        return cost, rows, cols
+
     def update(self, detections: List[Tuple[int, int, float]], timestamp: Optional[float] = None):
         """
         Main update step: associate detections to tracks and update Kalman filters.
-        :param detections: list of (r_idx, d_idx, power)
+        :param detections: list of (r_idx, d_idx, power) or ndarray (N, 3)
+            with the same columns
         :param timestamp: optional timestamp (float). If None, time.time() used.
         :return: list of active tracks after update
         """
@@ -151,27 +241,37 @@ class Tracker:
             preds.append([st[0], st[1]])
         preds = np.array(preds) if len(preds) > 0 else np.empty((0, 2))
 
-        # Prepare detections array
-        dets = np.array([[float(r), float(d)] for (r, d, p) in detections]) if len(detections) > 0 else np.empty((0, 2))
+        # Prepare detections array (list of tuples or ndarray (N, 3) alike)
+        dets = np.asarray(detections, dtype=float).reshape(-1, 3)[:, :2]
 
         # Step 2: Compute cost matrix and assignment
         if preds.shape[0] == 0:
             assigned_tracks = []
             assigned_dets = []
         else:
-            cost = self._gate_cost_matrix(preds, dets)
-            # apply gating: large cost -> set to large value
-            gated_cost = cost.copy()
-            gated_cost[gated_cost > self.dist_threshold] = 1e6
+            if dets.shape[0] >= KDTREE_MIN_DETS:
+                gated_cost, rows, cols = self._gate_cost_sparse(preds, dets)
+            else:
+                rows = cols = None
+                if USE_NUMBA:
+                    gated_cost = _gated_cost_nb(
+                        preds, np.ascontiguousarray(dets),
+                        float(self.dist_threshold))
+                else:
+                    gated_cost = self._gate_cost_matrix(preds, dets)
+                    # apply gating: large cost -> set to large value
+                    gated_cost[gated_cost > self.dist_threshold] = GATE_COST
 
             # Hungarian assignment
             row_ind, col_ind = linear_sum_assignment(gated_cost)
             assigned_tracks = []
             assigned_dets = []
             for r, c in zip(row_ind, col_ind):
-                if gated_cost[r, c] < 1e6:
+                if gated_cost[r, c] < GATE_COST:
+                    if rows is not None:
+                        r, c = rows[r], cols[c]
                     assigned_tracks.append(track_ids[r])
-                    assigned_dets.append(c)
+                    assigned_dets.append(int(c))
                 # else: assignment considered invalid (gated out)
 
         # Step 3: Update assigned tracks
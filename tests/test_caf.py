@@ -0,0 +1,125 @@
+import numpy as np
+from passive_radar.caf import caf
+
+
+def _noise(rng, n):
+    return (rng.standard_normal(n)
+            + 1j * rng.standard_normal(n)).astype(np.complex64)
+
+
+def test_compute_caf_delay_peak():
+    rng = np.random.default_rng(0)
+    ref = _noise(rng, 2048 * 8)
+    surv = np.roll(ref, 10)
+    proc = caf.CAFProcessor(block_size=2048, doppler_bins=16, delay_bins=64)
+    caf_map = proc.compute_caf(ref, surv)
+    assert caf_map.shape == (16, 64)
+    assert caf_map.dtype == np.float32
+    dop, delay = np.unravel_index(np.argmax(caf_map), caf_map.shape)
+    assert delay == 10
+    assert dop == 8  # нулевой Доплер в центре
+
+
+def test_process_multi_matches_mean():
+    rng = np.random.default_rng(1)
+    refs = [_noise(rng, 4096) for _ in range(3)]
+    survs = [np.roll(r, 5) for r in refs]
+    proc = caf.CAFProcessor(block_size=256, doppler_bins=16, delay_bins=32)
+    expected = np.mean([proc.compute_caf(r, s) for r, s in zip(refs, survs)],
+                       axis=0)
+    np.testing.assert_allclose(proc.process_multi(refs, survs), expected,
+                               rtol=1e-4, atol=1e-3)
+
+
+def test_compute_caf_int8_pairs_float16():
+    rng = np.random.default_rng(2)
+    raw = rng.integers(-127, 128, size=(4096, 2), dtype=np.int8)
+    iq = ((raw[:, 0] + 1j * raw[:, 1]) / 128).astype(np.complex64)
+    proc16 = caf.CAFProcessor(block_size=256, doppler_bins=16, delay_bins=32,
+                              dtype=np.float16)
+    proc32 = caf.CAFProcessor(block_size=256, doppler_bins=16, delay_bins=32)
+    out = proc16.compute_caf(raw, np.roll(raw, 3, axis=0))
+    assert out.dtype == np.float16
+    np.testing.assert_allclose(out, proc32.compute_caf(iq, np.roll(iq, 3)),
+                               rtol=2e-3)
+
+
+def test_slow_time_rd_doppler_peak():
+    rd = caf.SlowTimeRD(doppler_bins=16, delay_bins=8)
+    tone = np.exp(2j * np.pi * 3 * np.arange(20) / 16).astype(np.complex64)
+    out = None
+    for k, ph in enumerate(tone):
+        out = rd.push(np.full(16, ph, dtype=np.complex64))
+        assert (out is None) == (k < 15)
+    assert out.shape == (16, 8) and out.dtype == np.float32
+    assert np.all(out.argmax(axis=0) == 8 + 3)  # нулевой доплер в центре
+
+
+def test_slow_time_rd_keeps_target_delay():
+    # Эхо задержано на 10 отсчётов и смещено на 3 доплер-бина
+    rng = np.random.default_rng(8)
+    proc = caf.CAFProcessor(block_size=256, doppler_bins=16, delay_bins=32)
+    rd = caf.SlowTimeRD(doppler_bins=16, delay_bins=32)
+    out = None
+    for k in range(16):
+        ref = _noise(rng, 256)
+        echo = np.roll(ref, 10) * np.complex64(np.exp(2j * np.pi * 3 * k / 16))
+        out = rd.push(proc.compute_caf_block(ref, echo))
+    dop, delay = np.unravel_index(np.argmax(out), out.shape)
+    assert delay == 10
+    assert dop == 8 - 3  # REF · conj(ECHO): доплер эха со знаком минус
+
+
+def test_compute_caf_blocks_matches_single_blocks():
+    rng = np.random.default_rng(6)
+    ref = _noise(rng, 1100)
+    echo = np.roll(ref, 3)
+    proc = caf.CAFProcessor(block_size=256, delay_bins=64)
+    out = proc.compute_caf_blocks(ref, echo)
+    assert out.shape == (4, 256) and out.dtype == np.float32
+    for i in range(4):
+        blk = slice(i * 256, (i + 1) * 256)
+        expected = np.abs(proc.compute_caf_block(ref[blk], echo[blk]))
+        np.testing.assert_allclose(out[i], expected, rtol=1e-4, atol=1e-3)
+
+
+def test_compute_caf_blocks_into_buffer():
+    x = np.exp(2j * np.pi * 0.01 * np.arange(512)).astype(np.complex64)
+    proc = caf.CAFProcessor(block_size=128, delay_bins=32)
+    buf = np.empty((4, 128), dtype=np.float32)
+    assert proc.compute_caf_blocks(x, x, out=buf) is buf
+    np.testing.assert_allclose(buf, proc.compute_caf_blocks(x, x))
+
+
+def test_compute_caf_reused_ref_buffer_not_stale():
+    # Буфер ref переиспользуется на месте: края те же (нули), середина новая
+    rng = np.random.default_rng(4)
+    buf = np.zeros(4096, dtype=np.complex64)
+    proc = caf.CAFProcessor(block_size=256, doppler_bins=16, delay_bins=32)
+    for shift in (3, 11):
+        buf[8:-8] = _noise(rng, 4080)
+        surv = np.roll(buf, shift)
+        got = proc.compute_caf(buf, surv)
+        fresh = caf.CAFProcessor(block_size=256, doppler_bins=16,
+                                 delay_bins=32).compute_caf(buf, surv)
+        np.testing.assert_allclose(got, fresh, rtol=1e-5, atol=1e-5)
+        assert np.unravel_index(np.argmax(got), got.shape)[1] == shift
+
+
+def test_module_compute_caf_stream_with_reference():
+    rng = np.random.default_rng(5)
+    ref = _noise(rng, 256 * 5)
+    echo = np.roll(ref, 4)
+    proc = caf.CAFProcessor(block_size=256)
+
+    def blocks(x):
+        return (x[i * 256:(i + 1) * 256] for i in range(5))
+
+    out = np.concatenate(list(caf.compute_caf_stream(
+        blocks(echo), batch=2, processor=proc, ref_stream=blocks(ref))))
+    np.testing.assert_allclose(out, proc.compute_caf_blocks(ref, echo),
+                               rtol=1e-4, atol=1e-3)
+    auto = np.concatenate(list(caf.compute_caf_stream(
+        blocks(echo), batch=2, processor=proc)))
+    np.testing.assert_allclose(auto, proc.compute_caf_blocks(echo, echo),
+                               rtol=1e-4, atol=1e-3)
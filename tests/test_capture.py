@@ -7,3 +7,115 @@ def test_chunk_iq():
     chunks = list(kraken_reader.chunk_iq(iq, chunk_size=10))
     assert len(chunks) == 10
     assert all(isinstance(c, np.ndarray) for c in chunks)
+
+
+def test_ring_buffer_frames(tmp_path):
+    path = tmp_path / "iq.bin"
+    np.repeat(np.arange(8, dtype=np.complex64), 16).tofile(path)
+    reader = kraken_reader.KrakenReader(mode="file", file_path=str(path),
+                                        chunk_samples=16)
+    ring = kraken_reader.RingBuffer(reader, n_acc=4)
+    ring.start()
+    frame = ring.get(timeout=1.0)
+    ring.stop()
+    assert frame.shape == (4, 16)
+    first = frame[0, 0].real
+    assert np.array_equal(frame[:, 0].real, first + np.arange(4))
+
+
+def test_udp_reader_sequence_reassembly():
+    reader = kraken_reader.KrakenUDPReader(chunk_samples=4, seq_header=True,
+                                           reorder_depth=4)
+    packets = [(seq, np.full(4, seq, dtype=np.complex64))
+               for seq in (10, 12, 11, 14, 9, 19)]
+    reader._recv_packets = lambda: iter(packets)
+    out = [int(b[0].real) for b in reader.stream(copy=True)]
+    # 13 потерян (нули), 9 опоздал; приход 19 выталкивает окно вперёд
+    assert out[:5] == [10, 11, 12, 0, 14]
+    assert out == [10, 11, 12, 0, 14, 0]
+    assert reader.stats["late"] == 1
+    assert reader.stats["lost"] == 2  # 13 и 15
+
+
+def test_udp_reader_resyncs_after_counter_reset():
+    reader = kraken_reader.KrakenUDPReader(chunk_samples=4, seq_header=True,
+                                           reorder_depth=4)
+    seqs = list(range(100, 111)) + list(range(0, 11))
+    packets = [(seq, np.full(4, seq, dtype=np.complex64)) for seq in seqs]
+    reader._recv_packets = lambda: iter(packets)
+    out = [int(b[0].real) for b in reader.stream(copy=True)]
+    # DAQ перезапущен: второй прогон выдаётся целиком, а не как опоздавший
+    assert out == seqs
+    assert reader.stats["late"] == 0
+    assert reader.stats["lost"] == 0
+
+
+def test_chunk_iq_is_view():
+    iq = np.arange(105, dtype=np.complex64)
+    chunks = kraken_reader.chunk_iq(iq, chunk_size=10)
+    assert chunks.shape == (10, 10)
+    assert np.shares_memory(chunks, iq)
+    overlapped = kraken_reader.chunk_iq(iq, chunk_size=10, hop=5)
+    assert overlapped.shape == (20, 10)
+    assert overlapped[1, 0] == 5
+
+
+def test_multichannel_preprocess_keeps_complex64(tmp_path):
+    rng = np.random.default_rng(7)
+    base = (rng.standard_normal(512)
+            + 1j * rng.standard_normal(512)).astype(np.complex64)
+    files = []
+    for ch, phase in enumerate([0.0, 0.7, -1.2]):
+        f = tmp_path / f"ch{ch}.bin"
+        x = (base * np.exp(1j * phase) * (ch + 1) + 3).astype(np.complex64)
+        x[:512 - ch].tofile(f)
+        files.append(f)
+    reader = kraken_reader.KrakenReader(mode="file")
+    data = reader.load_channels(files)
+    assert data.shape == (3, 510) and data.dtype == np.complex64
+    reader.remove_dc()
+    reader.normalize()
+    reader.calibrate_phase()
+    assert reader.data.dtype == np.complex64
+    np.testing.assert_allclose(np.abs(reader.data).mean(axis=1),
+                               np.abs(reader.data[0]).mean(), rtol=1e-4)
+    np.testing.assert_allclose(reader.data[1], reader.data[0], atol=1e-3)
+
+
+def test_iter_chunks_memmap_matches_loaded(tmp_path):
+    rng = np.random.default_rng(3)
+    files = []
+    for ch in range(2):
+        f = tmp_path / f"ch{ch}.bin"
+        n = 1000 - ch
+        x = rng.standard_normal(n) + 1j * rng.standard_normal(n)
+        x.astype(np.complex64).tofile(f)
+        files.append(f)
+    loaded = kraken_reader.KrakenReader(mode="file")
+    loaded.load_channels(files)
+    mapped = kraken_reader.KrakenReader(mode="file")
+    assert mapped.open_channels(files) == 999
+    got = [c.copy() for c in mapped.iter_chunks(256)]
+    ref = list(loaded.iter_chunks(256))
+    assert [c.shape for c in got] == [(2, 256)] * 3 + [(2, 231)]
+    for a, b in zip(got, ref):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_calibrate_phase_in_place_complex64():
+    rng = np.random.default_rng(1)
+    base = (rng.standard_normal(256)
+            + 1j * rng.standard_normal(256)).astype(np.complex64)
+    reader = kraken_reader.KrakenReader(mode="file")
+    reader.data = np.stack([base, base * np.complex64(np.exp(0.4j))])
+    buf = reader.data
+    out = reader.calibrate_phase()
+    assert out is buf and out.dtype == np.complex64
+    np.testing.assert_allclose(out[1], out[0], atol=1e-5)
+
+
+def test_capture_reexports():
+    from passive_radar import capture
+    assert capture.KrakenReader is kraken_reader.KrakenReader
+    assert capture.chunk_iq is kraken_reader.chunk_iq
+    assert hasattr(capture.KrakenReader, "save_npy")
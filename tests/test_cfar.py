@@ -0,0 +1,77 @@
+import numpy as np
+from passive_radar.detect import cfar
+
+
+def test_cfar_2d_detects_target():
+    rng = np.random.default_rng(0)
+    rdmap = rng.exponential(1.0, size=(64, 128))
+    rdmap[32, 64] = 500.0
+    det_map, thr_map = cfar.cfar_2d(rdmap, guard_cells=(2, 2),
+                                    ref_cells=(4, 4), pfa=1e-6)
+    assert det_map.dtype == np.uint8
+    assert det_map[32, 64] == 1
+    assert det_map.sum() < 5
+    assert thr_map[0, 0] == 0  # граница без опорного окна не обрабатывается
+
+
+def test_cfar_2d_matches_direct_sum():
+    rng = np.random.default_rng(1)
+    rdmap = rng.exponential(1.0, size=(40, 50))
+    det_map, thr_map = cfar.cfar_2d(rdmap, guard_cells=(1, 2),
+                                    ref_cells=(3, 4), pfa=1e-3)
+    det_ref = np.zeros_like(det_map)
+    thr_ref = np.zeros_like(thr_map)
+    alpha = 3 * 4 * (1e-3 ** (-1 / 12) - 1)
+    n_train = 9 * 13 - 3 * 5
+    for i in range(4, 36):
+        for j in range(6, 44):
+            s = (rdmap[i - 4:i + 5, j - 6:j + 7].sum()
+                 - rdmap[i - 1:i + 2, j - 2:j + 3].sum())
+            thr_ref[i, j] = alpha * s / n_train
+            det_ref[i, j] = rdmap[i, j] > thr_ref[i, j]
+    np.testing.assert_allclose(thr_map, thr_ref)
+    np.testing.assert_array_equal(det_map, det_ref)
+
+
+def test_cfar_2d_filter_method_matches_sat():
+    rng = np.random.default_rng(2)
+    rdmap = rng.exponential(1.0, size=(48, 64))
+    det_sat, thr_sat = cfar.cfar_2d(rdmap, guard_cells=(2, 1),
+                                    ref_cells=(4, 6))
+    det_flt, thr_flt = cfar.cfar_2d(rdmap, guard_cells=(2, 1),
+                                    ref_cells=(4, 6), method="filter")
+    np.testing.assert_allclose(thr_flt, thr_sat, rtol=1e-9, atol=1e-12)
+    np.testing.assert_array_equal(det_flt, det_sat)
+
+
+def test_extract_detections_array():
+    det_map = np.zeros((4, 5), dtype=np.uint8)
+    det_map[1, 2] = det_map[3, 0] = det_map[2, 4] = 1
+    rdmap = np.arange(20, dtype=float).reshape(4, 5)
+    dets = cfar.extract_detections(det_map, rdmap, threshold=10)
+    np.testing.assert_array_equal(dets, [[2, 4, 14], [3, 0, 15]])
+    dets32 = cfar.extract_detections(det_map, rdmap.astype(np.float32))
+    assert dets32.dtype == np.float32
+    empty = cfar.extract_detections(np.zeros_like(det_map), rdmap)
+    assert empty.shape == (0, 3)
+
+
+def test_cacfar_precomputed_window():
+    det = cfar.CACFAR(guard_cells=(1, 2), ref_cells=(3, 4), pfa=1e-3)
+    assert det.mask.shape == (9, 13)
+    assert det.n_train == 9 * 13 - 3 * 5
+    assert not det.mask[4, 6]  # CUT
+    rdmap = np.random.default_rng(3).exponential(1.0, size=(32, 40))
+    expected = cfar.cfar_2d(rdmap, (1, 2), (3, 4), 1e-3)
+    for a, b in zip(det.apply(rdmap), expected):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_cacfar_reuses_buffers():
+    det = cfar.CACFAR(guard_cells=(1, 1), ref_cells=(2, 2))
+    rng = np.random.default_rng(4)
+    det_a, thr_a = det.apply(rng.exponential(1.0, size=(16, 20)))
+    det_b, thr_b = det.apply(rng.exponential(1.0, size=(16, 20)))
+    assert det_a is det_b and thr_a is thr_b
+    assert thr_b.dtype == np.float32
+    assert not thr_b[0].any() and not thr_b[:, -1].any()
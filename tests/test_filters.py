@@ -5,3 +5,52 @@ def test_normalize():
     arr = np.array([1, 2, 3], dtype=float)
     out = filters.normalize(arr)
     assert np.isclose(np.linalg.norm(out), 1.0)
+
+
+def test_mti_filter_any_ndim():
+    data = np.arange(24, dtype=float).reshape(4, 3, 2) ** 2
+    out = filters.mti_filter(data, delay=2)
+    assert not out[:2].any()
+    np.testing.assert_array_equal(out[2:], data[2:] - data[:-2])
+    np.testing.assert_array_equal(
+        filters.mti_filter(np.array([1.0, 4.0, 9.0])), [0, 3, 5])
+
+
+def test_fir_highpass_matches_lfilter():
+    from scipy.signal import firwin, lfilter
+    x = np.random.default_rng(0).standard_normal((500, 3))
+    taps = firwin(31, 50 / 500, pass_zero=False)
+    out = filters.fir_highpass(x, cutoff=50, fs=1000, order=31)
+    np.testing.assert_allclose(out, lfilter(taps, 1.0, x, axis=0), atol=1e-5)
+    np.testing.assert_allclose(filters.fir_highpass(x[:, 0], 50, 1000, 31),
+                               out[:, 0], atol=1e-5)
+
+
+def test_fir_highpass_stream_is_seamless():
+    x = np.random.default_rng(1).standard_normal((400, 2))
+    full, _ = filters.fir_highpass_stream(x, cutoff=50, fs=1000, order=31)
+    a, st = filters.fir_highpass_stream(x[:150], cutoff=50, fs=1000, order=31)
+    b, _ = filters.fir_highpass_stream(x[150:], cutoff=50, fs=1000, order=31,
+                                       state=st)
+    np.testing.assert_allclose(np.concatenate([a, b]), full, atol=1e-6)
+
+
+def test_fir_highpass_stream_blocks_match_single_lfilter():
+    from scipy.signal import lfilter, lfilter_zi
+
+    order = 31
+    x = np.random.default_rng(2).standard_normal((500, 3))
+    taps = filters._design_hp(order, 50, 1000)
+    zi = lfilter_zi(taps, 1.0)[:, None] * x[0]
+    expected, _ = lfilter(taps, 1.0, x, axis=0, zi=zi)
+
+    out, state = [], None
+    for lo, hi in ((0, 7), (7, 130), (130, 131), (131, 500)):
+        y, state = filters.fir_highpass_stream(x[lo:hi], cutoff=50, fs=1000,
+                                               order=order, state=state)
+        out.append(y)
+    out = np.concatenate(out)
+    np.testing.assert_allclose(out, expected, atol=1e-5)
+    # после переходного участка первого блока — то же, что fir_highpass
+    full = filters.fir_highpass(x, cutoff=50, fs=1000, order=order)
+    np.testing.assert_allclose(out[order - 1:], full[order - 1:], atol=1e-5)
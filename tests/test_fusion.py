@@ -0,0 +1,12 @@
+import numpy as np
+from passive_radar.network.fusion_utils import fuse_tracks_lsq
+
+
+def test_fuse_tracks_lsq_weighted_mean():
+    reports = [
+        {"tracks": [{"position": [1, 2, 3], "snr": 1.0}]},
+        {"tracks": [{"position": [3, 4, 5], "snr": 3.0}]},
+    ]
+    fused = fuse_tracks_lsq(reports)
+    np.testing.assert_allclose(fused[0]["position"], [2.5, 3.5, 4.5])
+    assert fused[0]["confidence"] == 2.0
@@ -0,0 +1,18 @@
+import numpy as np
+from passive_radar.postprocess import morphology
+
+
+def test_morph_clean_removes_small_and_shares_labels():
+    test = np.zeros((20, 20), dtype=np.uint8)
+    test[2:4, 2:4] = 1      # 4 пикселя — меньше min_size
+    test[10:14, 10:14] = 1
+    test[15:19, 2:6] = 1
+    clean, labels, num = morphology.morph_clean(
+        test, min_size=5, structure_size=2, return_labels=True)
+    assert clean.dtype == np.uint8
+    assert clean[2:4, 2:4].sum() == 0 and clean[10:14, 10:14].all()
+    ref_labels, ref_num = morphology.label_regions(clean)
+    assert num == ref_num == 2
+    assert np.array_equal(labels, ref_labels)
+    plain = morphology.morph_clean(test, min_size=5, structure_size=2)
+    assert np.array_equal(clean, plain)
@@ -0,0 +1,22 @@
+import numpy as np
+from passive_radar.output import saver
+
+
+def test_manifest_append_and_fold(tmp_path):
+    base = str(tmp_path)
+    eid = saver.save_event(base, {"range": 10, "doppler": -2, "track_id": 1})
+    saver.save_event(base, {"range": 20, "doppler": 3})
+    patch = np.arange(16.0).reshape(4, 4)
+    saver.save_patch(base, eid, patch, fmt="npy")
+
+    events = {ev["id"]: ev for ev in saver.load_manifest(base)["events"]}
+    assert len(events) == 2
+    assert events[eid]["range"] == 10
+    assert events[eid]["patch_index"] == 0
+    np.testing.assert_array_equal(saver.load_patch(base, eid), patch)
+
+    saver.compact(base)
+    lines = (tmp_path / "manifest.jsonl").read_text().splitlines()
+    assert len(lines) == 2
+    manifest = saver.load_manifest(base)
+    assert manifest["events"][0]["patch"] == events[eid]["patch"]
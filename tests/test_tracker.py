@@ -0,0 +1,41 @@
+import numpy as np
+from passive_radar.track.tracker import Tracker
+
+
+def test_tracker_keeps_ids_for_moving_targets():
+    tr = Tracker(dt=1.0, dist_threshold=8.0, max_missed=3)
+    for t in range(10):
+        dets = np.array([[10 + 0.8 * t, 20 + 0.3 * t, 10.0],
+                         [40 - 0.5 * t, 60 - 0.6 * t, 8.0]])
+        tracks = tr.update(dets, timestamp=float(t))
+    assert sorted(trk.id for trk in tracks) == [1, 2]
+    pos = {trk.id: trk.state[:2] for trk in tracks}
+    np.testing.assert_allclose(pos[1], [17.2, 22.7], atol=1.0)
+    np.testing.assert_allclose(pos[2], [35.5, 54.6], atol=1.0)
+
+
+def test_tracker_gates_far_detections():
+    tr = Tracker(dt=1.0, dist_threshold=5.0)
+    tr.update([(0.0, 0.0, 1.0)])
+    tracks = tr.update([(50.0, 50.0, 1.0)])
+    assert sorted(trk.id for trk in tracks) == [1, 2]
+
+
+def test_tracker_kdtree_gating_matches_dense():
+    from scipy.optimize import linear_sum_assignment
+    from passive_radar.track.tracker import GATE_COST
+
+    rng = np.random.default_rng(0)
+    preds = rng.uniform(0, 100, (20, 2))
+    dets = rng.uniform(0, 100, (60, 2))
+    tr = Tracker(dist_threshold=8.0)
+
+    dense = tr._gate_cost_matrix(preds, dets)
+    dense[dense > tr.dist_threshold] = GATE_COST
+    r, c = linear_sum_assignment(dense)
+    expected = {(i, j) for i, j in zip(r, c) if dense[i, j] < GATE_COST}
+
+    cost, rows, cols = tr._gate_cost_sparse(preds, dets)
+    r, c = linear_sum_assignment(cost)
+    got = {(rows[i], cols[j]) for i, j in zip(r, c) if cost[i, j] < GATE_COST}
+    assert got == expected
@@ -1,6 +1,58 @@
+import numpy as np
 from passive_radar.tools import utils
 
 def test_timer_context():
     with utils.timer("dummy"):
         x = 1 + 1
     assert x == 2
+
+
+def test_cfar_threshold_matches_loop():
+    x = np.random.default_rng(0).exponential(1.0, 50)
+    g, t = 2, 5
+    alpha = t * (1e-3 ** (-1 / t) - 1)
+    ref = [alpha * np.mean(np.r_[x[max(0, i - g - t):max(0, i - g)],
+                                 x[min(50, i + g):min(50, i + g + t)]])
+           for i in range(50)]
+    np.testing.assert_allclose(utils.cfar_threshold(x, g, t, 1e-3), ref)
+
+
+def test_cfar_threshold_keeps_float32():
+    x = np.random.default_rng(1).exponential(1.0, 64).astype(np.float32)
+    thr = utils.cfar_threshold(x)
+    assert thr.dtype == np.float32
+    np.testing.assert_allclose(thr, utils.cfar_threshold(x.astype(float)),
+                               rtol=1e-5)
+
+
+def test_moving_average_matches_convolve():
+    x = np.random.default_rng(2).standard_normal(40)
+    for N in (1, 4, 5, 40):
+        expected = np.convolve(x, np.ones(N) / N, mode="same")
+        np.testing.assert_allclose(utils.moving_average(x, N), expected)
+
+
+def test_normalize_in_place():
+    x = np.array([2.0, 4.0, 6.0], dtype=np.float32)
+    out = utils.normalize(x, out=x)
+    assert out is x and out.dtype == np.float32
+    np.testing.assert_allclose(x, [0, 0.5, 1], atol=1e-6)
+    np.testing.assert_allclose(utils.normalize(np.array([1, 3])), [0, 1],
+                               atol=1e-9)
+
+
+def test_db20_matches_numpy():
+    rng = np.random.default_rng(3)
+    x = (rng.standard_normal((8, 6)) + 1j).astype(np.complex64)
+    out = np.empty(x.shape, dtype=np.float32)
+    assert utils.db20(x, out=out) is out
+    np.testing.assert_allclose(out, 20 * np.log10(np.abs(x) + 1e-12),
+                               atol=1e-4)
+
+
+def test_cluster_detections_matches_sklearn():
+    from sklearn.cluster import DBSCAN
+    pts = np.random.default_rng(4).uniform(0, 30, size=(120, 2))
+    labels, _ = utils.cluster_detections(pts, eps=2.5, min_samples=3)
+    expected = DBSCAN(eps=2.5, min_samples=3).fit(pts).labels_
+    np.testing.assert_array_equal(labels, expected)